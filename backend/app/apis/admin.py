@@ -0,0 +1,77 @@
+import hmac
+import os
+from typing import Literal, Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Response
+from fastapi.responses import PlainTextResponse
+from app.registry import registry
+from app.monitoring import TimedRoute
+from app.profiling import profiles, PROFILING, PROFILE_SAMPLE_RATE
+
+# Admin calls must send it in the X-Admin-Token header; unset disables them
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN")
+
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled, set ADMIN_TOKEN to enable them")
+    # Header values arrive decoded as latin-1; compare the raw bytes in constant time
+    if x_admin_token is None or not hmac.compare_digest(x_admin_token.encode("latin-1"), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+
+router = APIRouter(prefix="/admin", tags=["admin"], dependencies=[Depends(require_admin)], route_class=TimedRoute)
+
+
+@router.get("/models")
+def models():
+    return registry.status()
+
+
+@router.post("/models/{name}/reload", status_code=202)
+def reload_model(name: str, wait: bool = False):
+    """
+    Load the model's files again and swap them in once they pass a smoke
+    prediction. Returns immediately unless `wait` is set.
+    """
+    if name not in registry.names:
+        raise HTTPException(status_code=404, detail=f"Unknown model '{name}'")
+
+    if not wait:
+        registry.reload_in_background(name)
+        return {"model": name, "status": "reloading"}
+
+    try:
+        artifacts = registry.reload(name)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Reload failed, previous version still live: {e!r}")
+    return {"model": name, "status": "reloaded", "version": artifacts.version}
+
+
+@router.get("/profiles")
+def list_profiles():
+    """The most recent request profiles, newest first."""
+    return {"enabled": PROFILING, "sample_rate": PROFILE_SAMPLE_RATE, "profiles": profiles.summaries()}
+
+
+@router.get("/profiles/{profile_id}")
+def download_profile(
+    profile_id: int,
+    format: Literal["pstats", "text"] = "pstats",
+    sort: Literal["cumulative", "tottime", "ncalls"] = "cumulative",
+    limit: int = 50,
+):
+    """
+    A request profile as a pstats file (for `python -m pstats`, snakeviz...)
+    or as text: the top `limit` functions by `sort`.
+    """
+    profile = profiles.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail=f"No profile {profile_id}, it may have been evicted")
+
+    if format == "text":
+        return PlainTextResponse(profile.text(sort, limit))
+    return Response(
+        content=profile.data,
+        media_type="application/octet-stream",
+        headers={"Content-Disposition": f'attachment; filename="profile-{profile_id}.prof"'},
+    )
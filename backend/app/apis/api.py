@@ -1,15 +1,157 @@
-from fastapi import APIRouter
+from functools import partial
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.exceptions import RequestValidationError
+from pydantic import ValidationError
+import numpy as np
+from typing import List, Optional
 from app.schemas.patient import PatientInput
 from app.schemas.prediction import PredictionOutput
-from src.cox.model_loader import ModelArtifacts
-from src.cox.predict import predict_patient
+from app.schemas.survival_curve import SurvivalCurveInput, SurvivalCurveOutput
+from app.schemas.sweep import SweepInput, SweepOutput
+from app.registry import registry
+from app.executor import pool, ConcurrencyLimit
+from app.streaming import score_stream, BodyStreamingResponse, STREAM_OPENAPI
+from app.monitoring import TimedRoute
+from src.cox.predict import predict_patient, predict_batch, predict_survival_curve, predict_sweep
 
-router = APIRouter(prefix="/cox", tags=["cox"])
-artifacts = ModelArtifacts()
+router = APIRouter(prefix="/cox", tags=["cox"], route_class=TimedRoute)
+get_artifacts = registry.dependency("cox")
 
-@router.post("/predict", response_model=PredictionOutput)
-def predict(patient: PatientInput):
-    return predict_patient(patient.model_dump(), artifacts)
+limits = {
+    "predict": ConcurrencyLimit("/cox/predict"),
+    "predict-batch": ConcurrencyLimit("/cox/predict-batch"),
+    "predict-stream": ConcurrencyLimit("/cox/predict-stream", max_concurrent=2, max_queue=4),
+    "survival-curve": ConcurrencyLimit("/cox/survival-curve"),
+    "sweep": ConcurrencyLimit("/cox/sweep"),
+}
+
+class ExplainParams:
+    """?explain=true adds every feature's contribution; ?explain_top=k keeps the k largest."""
+
+    def __init__(
+        self,
+        explain: bool = False,
+        explain_top: Optional[int] = Query(None, ge=1),
+    ):
+        self.explain = explain
+        self.explain_top = explain_top
+
+@router.post("/predict", response_model=PredictionOutput, response_model_exclude_none=True)
+async def predict(patient: PatientInput, artifacts=Depends(get_artifacts), params: ExplainParams = Depends()):
+    async with limits["predict"]:
+        return await pool.run(
+            "cox", artifacts, predict_patient, patient.model_dump(),
+            explain=params.explain, explain_top=params.explain_top,
+        )
+
+@router.post("/predict-batch", response_model=List[PredictionOutput], response_model_exclude_none=True)
+async def predict_many(patients: List[PatientInput], artifacts=Depends(get_artifacts), params: ExplainParams = Depends()):
+    async with limits["predict-batch"]:
+        return await pool.run(
+            "cox", artifacts, predict_batch, [p.model_dump() for p in patients],
+            explain=params.explain, explain_top=params.explain_top,
+        )
+
+@router.post("/predict-stream", openapi_extra=STREAM_OPENAPI)
+async def predict_stream(request: Request, artifacts=Depends(get_artifacts), params: ExplainParams = Depends()):
+    """
+    Score an uploaded NDJSON or CSV file of patients, streaming one NDJSON
+    result per row back in input order. Malformed rows get an "error" line.
+    """
+    limits["predict-stream"].check()
+    score = partial(predict_batch, explain=params.explain, explain_top=params.explain_top)
+    return BodyStreamingResponse(
+        score_stream(request, PatientInput, "cox", artifacts, score, limits["predict-stream"]),
+        media_type="application/x-ndjson",
+        # Returned responses skip the headers the dependencies set
+        headers={"X-Model-Version": artifacts.version},
+    )
+
+@router.post("/survival-curve", response_model=SurvivalCurveOutput)
+async def survival_curve(request: SurvivalCurveInput, artifacts=Depends(get_artifacts)):
+    async with limits["survival-curve"]:
+        return await pool.run(
+            "cox",
+            artifacts,
+            predict_survival_curve,
+            request.patient.model_dump(),
+            horizons=request.horizons,
+            step_days=request.step_days,
+        )
+
+# PatientInput's field constraints, which pydantic does not enforce itself
+_CONSTRAINTS = {
+    name: props.get("extra", {})
+    for name, props in PatientInput.model_json_schema()["properties"].items()
+}
+
+def _sweep_errors(patient, feature, values, loc, is_range):
+    """422 errors for the swept values PatientInput or the field's constraints reject."""
+    extra = _CONSTRAINTS[feature]
+    errors = []
+    for i, value in enumerate(values):
+        # A range has no list to point into; the error's input names the value
+        at = loc if is_range else (*loc, i)
+        try:
+            PatientInput.model_validate({**patient, feature: value})
+        except ValidationError as e:
+            for error in e.errors(include_url=False, include_context=False):
+                if is_range and error["type"] == "int_from_float":
+                    error["msg"] = f"'{feature}' takes whole numbers; choose `start`, `stop` and `num` so every value is whole"
+                errors.append({**error, "loc": at})
+            continue
+        if "allowed_values" in extra and value not in extra["allowed_values"]:
+            errors.append({
+                "type": "sweep_value", "loc": at, "input": value,
+                "msg": f"'{feature}' takes one of {extra['allowed_values']}",
+            })
+        elif value < extra.get("min", value) or value > extra.get("max", value):
+            errors.append({
+                "type": "sweep_value", "loc": at, "input": value,
+                "msg": f"'{feature}' takes values from {extra.get('min', '-inf')} to {extra.get('max', 'inf')}",
+            })
+    # A range's values come from the same three numbers; one error is enough to fix them
+    return errors[:1] if is_range else errors
+
+@router.post("/sweep", response_model=SweepOutput)
+async def sweep(request: SweepInput, artifacts=Depends(get_artifacts)):
+    """
+    What-if analysis: vary one or two features of a patient over a range
+    and score the whole grid in one call. Swept values outside a field's
+    range or allowed values, or fractional for an integer field, get a 422.
+    """
+    patient = request.patient.model_dump()
+    axes = []
+    errors = []
+    for index, axis in enumerate(request.axes):
+        if axis.feature not in PatientInput.model_fields:
+            raise HTTPException(status_code=400, detail=f"Unknown feature '{axis.feature}'")
+        if axis.values is not None:
+            if axis.start is not None or axis.stop is not None:
+                raise HTTPException(status_code=400, detail=f"Axis '{axis.feature}' takes `values` or `start` and `stop`, not both")
+            values = axis.values
+        elif axis.start is not None and axis.stop is not None:
+            # Snap float error (2.0000000000000004) so whole-number steps stay whole
+            values = [float(round(v)) if abs(v - round(v)) < 1e-9 else v
+                      for v in np.linspace(axis.start, axis.stop, axis.num).tolist()]
+        else:
+            raise HTTPException(status_code=400, detail=f"Axis '{axis.feature}' needs `values` or `start` and `stop`")
+        axes.append((axis.feature, values))
+        loc = ("body", "axes", index) + (() if axis.values is None else ("values",))
+        errors += _sweep_errors(patient, axis.feature, values, loc, axis.values is None)
+
+    if len({feature for feature, _ in axes}) != len(axes):
+        raise HTTPException(status_code=400, detail="Sweep axes must use different features")
+    # Every variant differs from the validated patient in the swept fields
+    # only, so checking each value checks every patient of the grid
+    if errors:
+        raise RequestValidationError(errors)
+
+    try:
+        async with limits["sweep"]:
+            return await pool.run("cox", artifacts, predict_sweep, patient, axes)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("/schema")
 def get_patient_schema():
@@ -32,7 +174,7 @@ def get_patient_schema():
     }
 
 @router.get("/model-info")
-def model_info():
+def model_info(artifacts=Depends(get_artifacts)):
     return {
         "model": {
             "type": "Cox proportional hazards",
@@ -1,29 +1,65 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
+from typing import List
 from app.schemas.patient_simple import PatientInput
-from app.schemas.prediction_simple import PredictionOutput
+from app.schemas.prediction_simple import PredictionOutput, BatchPredictionOutput
 from app.schemas.graph_simple import GraphOutput, GraphNode, GraphEdge
-from src.bn.model_loader_simple import ModelArtifacts
-from src.bn.predict_simple import predict_patient
-from src.bn.predict_simple import predict_flexible
+from app.registry import registry
+from app.executor import pool, ConcurrencyLimit
+from app.streaming import score_stream, BodyStreamingResponse, STREAM_OPENAPI
+from app.monitoring import TimedRoute
+from src.bn.predict_simple import predict_patient, predict_batch
+from src.bn.predict_simple import predict_flexible, value_of_information
 from app.schemas.flexible_prediction_simple import FlexiblePredictionInput, FlexiblePredictionOutput
-from fastapi import HTTPException
+from app.schemas.value_of_information_simple import ValueOfInformationInput, ValueOfInformationOutput
+from src.bn.graph_image import MEDIA_TYPES
+from fastapi import HTTPException, Request, Response
+from typing import Literal
 
-from fastapi.responses import StreamingResponse
-import io
-import matplotlib.pyplot as plt
-import networkx as nx
+router = APIRouter(prefix="/bayesian", tags=["Bayesian Network"], route_class=TimedRoute)
+get_artifacts = registry.dependency("bayesian")
 
-router = APIRouter(prefix="/bayesian", tags=["Bayesian Network"])
-artifacts = ModelArtifacts()
+limits = {
+    "predict": ConcurrencyLimit("/bayesian/predict"),
+    "predict-batch": ConcurrencyLimit("/bayesian/predict-batch"),
+    "predict-stream": ConcurrencyLimit("/bayesian/predict-stream", max_concurrent=2, max_queue=4),
+    "predict-flexible": ConcurrencyLimit("/bayesian/predict-flexible"),
+    "value-of-information": ConcurrencyLimit("/bayesian/value-of-information"),
+}
 
 
 @router.post("/predict", response_model=PredictionOutput)
-def predict(patient: PatientInput):
-    return predict_patient(patient.model_dump(), artifacts)
+async def predict(patient: PatientInput, artifacts=Depends(get_artifacts)):
+    async with limits["predict"]:
+        return await pool.run("bayesian", artifacts, predict_patient, patient.model_dump())
+
+
+@router.post("/predict-batch", response_model=List[BatchPredictionOutput], response_model_exclude_none=True)
+async def predict_many(patients: List[PatientInput], artifacts=Depends(get_artifacts)):
+    """
+    Posteriors for a list of patients, in order. A patient with a value the
+    network does not know gets an "error" in its place.
+    """
+    async with limits["predict-batch"]:
+        return await pool.run("bayesian", artifacts, predict_batch, [p.model_dump() for p in patients])
+
+
+@router.post("/predict-stream", openapi_extra=STREAM_OPENAPI)
+async def predict_stream(request: Request, artifacts=Depends(get_artifacts)):
+    """
+    Score an uploaded NDJSON or CSV file of patients, streaming one NDJSON
+    result per row back in input order. Malformed rows get an "error" line.
+    """
+    limits["predict-stream"].check()
+    return BodyStreamingResponse(
+        score_stream(request, PatientInput, "bayesian", artifacts, predict_batch, limits["predict-stream"]),
+        media_type="application/x-ndjson",
+        # Returned responses skip the headers the dependencies set
+        headers={"X-Model-Version": artifacts.version},
+    )
 
 
 @router.get("/graph", response_model=GraphOutput)
-def get_graph():
+def get_graph(artifacts=Depends(get_artifacts)):
     nodes = [
         GraphNode(id=n, label=n.replace("_", " ").title())
         for n in artifacts.nodes
@@ -63,56 +99,77 @@ def get_patient_schema():
 
 
 @router.get("/model-info")
-def model_info():
+def model_info(artifacts=Depends(get_artifacts)):
     return {
         "model": {
             "type": "Bayesian Network",
             "engine": "pgmpy",
             "target": "recidiva",
-            "inference": "Exact (Variable Elimination)"
+            "inference": (
+                "Exact (Junction Tree)" if artifacts.engine == "junction_tree"
+                else "Exact (Variable Elimination)"
+            )
         },
         "n_nodes": len(artifacts.nodes),
         "n_edges": len(artifacts.edges)
     }
 
 
+@router.get("/cache-stats")
+def cache_stats(artifacts=Depends(get_artifacts)):
+    return {**artifacts.cache.stats(), "posterior_tables": artifacts.posterior_tables.stats()}
+
+
 @router.get("/graph-image")
-def get_graph_image():
+def get_graph_image(
+    request: Request,
+    format: Literal["png", "svg"] = "png",
+    artifacts=Depends(get_artifacts),
+):
     """
-    Returns a PNG image of the Bayesian Network.
+    Returns a PNG (or SVG) image of the Bayesian Network.
+
+    The image is rendered once per loaded model; clients revalidate with
+    If-None-Match and get a 304 while it is unchanged.
     """
-    G = nx.DiGraph()
-    G.add_edges_from(artifacts.edges)
+    body, etag = artifacts.graph_images.get(format)
+    headers = {
+        "ETag": etag,
+        "Cache-Control": "public, no-cache",
+        "X-Model-Version": artifacts.version,
+    }
 
-    plt.figure(figsize=(16, 12))
-    
-    # Use spring_layout if pygraphviz is unavailable
-    try:
-        pos = nx.nx_agraph.graphviz_layout(G, prog="dot")
-    except:
-        pos = nx.spring_layout(G, seed=42, k=1.5)
-
-    nx.draw(
-        G,
-        pos,
-        with_labels=True,
-        node_size=2500,
-        node_color="lightblue",
-        font_size=10,
-        arrowsize=20
-    )
+    if_none_match = request.headers.get("if-none-match", "")
+    tags = [t.strip().removeprefix("W/") for t in if_none_match.split(",")]
+    if etag in tags or "*" in tags:
+        return Response(status_code=304, headers=headers)
 
-    # Save image to bytes
-    buf = io.BytesIO()
-    plt.savefig(buf, format="png", bbox_inches="tight")
-    plt.close()
-    buf.seek(0)
-    return StreamingResponse(buf, media_type="image/png")
+    return Response(content=body, media_type=MEDIA_TYPES[format], headers=headers)
 
 
 @router.post("/predict-flexible", response_model=FlexiblePredictionOutput)
-def predict_flexible_endpoint(request: FlexiblePredictionInput):
+async def predict_flexible_endpoint(request: FlexiblePredictionInput, artifacts=Depends(get_artifacts)):
+    try:
+        async with limits["predict-flexible"]:
+            return await pool.run(
+                "bayesian", artifacts, predict_flexible, request.targets, request.evidence
+            )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.post("/value-of-information", response_model=ValueOfInformationOutput)
+async def value_of_information_endpoint(request: ValueOfInformationInput, artifacts=Depends(get_artifacts)):
+    """
+    Rank the unobserved variables by how much observing them is expected
+    to change the target's posterior, given the evidence.
+    """
     try:
-        return predict_flexible(request.targets, request.evidence, artifacts)
+        async with limits["value-of-information"]:
+            return await pool.run(
+                "bayesian", artifacts, value_of_information,
+                request.target, request.evidence,
+                candidates=request.candidates, rank_by=request.rank_by,
+            )
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
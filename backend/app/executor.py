@@ -0,0 +1,209 @@
+import asyncio
+import functools
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import anyio
+from fastapi import HTTPException
+
+from app.profiling import call_profiled, current_profile, profile_stats
+from app.registry import registry
+from src.monitoring.metrics import metrics
+
+# Processes for CPU-bound inference; 0 runs inference on threads of its own
+INFERENCE_POOL_WORKERS = int(os.environ.get("INFERENCE_POOL_WORKERS", "0"))
+
+# Inference calls running at once on threads while the pool is disabled.
+# They get their own limiter, so they never take the threadpool tokens
+# that sync endpoints (/schema, /model-info) wait for
+INFERENCE_THREADS = int(os.environ.get("INFERENCE_THREADS", "4"))
+
+# Per-endpoint admission: requests running at once, and waiting behind them,
+# before new ones are rejected with 503
+INFERENCE_MAX_CONCURRENCY = int(os.environ.get("INFERENCE_MAX_CONCURRENCY", "4"))
+INFERENCE_MAX_QUEUE = int(os.environ.get("INFERENCE_MAX_QUEUE", "32"))
+
+
+# Model versions a pool process keeps loaded, so requests pinned to the
+# previous version still run on it while a reload is rolling out
+WORKER_VERSIONS = 2
+
+# {model: {version: artifacts}} in a pool process, oldest version first
+_worker_artifacts = {}
+
+
+class ModelVersionUnavailable(Exception):
+    """A pool process has neither loaded the requested model version nor can it find it on disk."""
+
+    def __init__(self, model, version):
+        super().__init__(model, version)
+        self.model = model
+        self.version = version
+
+
+def _load_version(model, version):
+    """Artifacts of exactly `version` in this pool process, loading them from disk if they are there."""
+    versions = _worker_artifacts.setdefault(model, {})
+    artifacts = versions.get(version)
+    if artifacts is not None:
+        return artifacts
+
+    # The files may hold another version (replaced but not reloaded by the
+    # API yet); loading them would answer for a version they are not
+    if registry.disk_version(model) != version:
+        raise ModelVersionUnavailable(model, version)
+    artifacts = registry.build(model)
+    if artifacts.version != version:
+        raise ModelVersionUnavailable(model, version)
+
+    versions[version] = artifacts
+    while len(versions) > WORKER_VERSIONS:
+        del versions[next(iter(versions))]
+    return artifacts
+
+
+def _warm_worker():
+    for name in registry.names:
+        try:
+            artifacts = registry.build(name)
+        except Exception:
+            continue  # the first call for the model tries again
+        _worker_artifacts[name] = {artifacts.version: artifacts}
+
+
+def _call(model, version, fn, args, kwargs, profile=False):
+    """
+    Runs inside a pool process, on that process's copy of the pinned model
+    version. Returns the result, the metrics the call recorded and, with
+    `profile`, its cProfile stats.
+    """
+    artifacts = _load_version(model, version)
+    if not profile:
+        return fn(*args, artifacts, **kwargs), metrics.drain(), None
+    result, stats = profile_stats(fn, *args, artifacts, **kwargs)
+    return result, metrics.drain(), stats
+
+
+class InferencePool:
+    """
+    Dedicated process pool for inference, so heavy queries do not hold the
+    GIL or the threadpool that light endpoints (/schema, /model-info) use.
+    Without workers, inference runs on threads behind a limiter of its own,
+    which still keeps it off that threadpool.
+
+    Worker processes are spawned, not forked, because the API process is
+    already running threads; each loads its own copy of the models.
+    """
+
+    def __init__(self, workers, threads=INFERENCE_THREADS):
+        self.workers = workers
+        self.threads = threads
+        self._executor = None
+        self._limiter = None
+
+    def start(self):
+        if self.workers <= 0 or self._executor is not None:
+            return
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_warm_worker,
+        )
+        # Start every worker now rather than on the first requests
+        for _ in range(self.workers):
+            self._executor.submit(int)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def run(self, model, artifacts, fn, *args, **kwargs):
+        """
+        fn(*args, artifacts, **kwargs) in a pool process, or on one of at
+        most `threads` inference threads when the pool is disabled.
+        `artifacts` pins the model version the request was admitted with.
+        """
+        if self._executor is None:
+            if self._limiter is None:
+                self._limiter = anyio.CapacityLimiter(self.threads)
+            call = functools.partial(call_profiled, fn, *args, artifacts, **kwargs)
+            return await anyio.to_thread.run_sync(call, limiter=self._limiter)
+
+        executor = self._executor
+        loop = asyncio.get_running_loop()
+        profile = current_profile()
+        try:
+            result, recorded, stats = await loop.run_in_executor(
+                executor, _call, model, artifacts.version, fn, args, kwargs, profile is not None
+            )
+        except ModelVersionUnavailable:
+            # The files on disk moved on without the API process; catch up so
+            # new requests pin a version the workers can load (once per change
+            # of the files, so a broken upload is not reloaded on every request)
+            if registry.get(model).version == artifacts.version and registry.changed(model):
+                registry.reload_in_background(model)
+            raise HTTPException(
+                status_code=503,
+                detail=f"Model version {artifacts.version} is being replaced, retry later",
+                headers={"Retry-After": "1"},
+            )
+        except BrokenProcessPool:
+            # A worker died (e.g. OOM-killed); replace the pool once and let the client retry
+            if self._executor is executor:
+                self.shutdown()
+                self.start()
+            raise HTTPException(
+                status_code=503,
+                detail="Inference worker restarted, retry later",
+                headers={"Retry-After": "1"},
+            )
+        metrics.merge(recorded)
+        if stats is not None:
+            profile.add(stats)
+        return result
+
+
+class ConcurrencyLimit:
+    """
+    At most `max_concurrent` requests of one endpoint run at a time and at
+    most `max_queue` wait behind them; anything beyond that gets a 503
+    straight away instead of queueing without bound.
+    """
+
+    def __init__(self, name, max_concurrent=INFERENCE_MAX_CONCURRENCY, max_queue=INFERENCE_MAX_QUEUE):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.pending = 0
+        self._semaphore = None
+
+    def check(self):
+        """Raise the 503 now if a new request would not be admitted."""
+        if self.pending >= self.max_concurrent + self.max_queue:
+            raise HTTPException(
+                status_code=503,
+                detail=f"{self.name} is at capacity, retry later",
+                headers={"Retry-After": "1"},
+            )
+
+    async def __aenter__(self):
+        self.check()
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrent)
+
+        self.pending += 1
+        try:
+            await self._semaphore.acquire()
+        except BaseException:
+            self.pending -= 1
+            raise
+
+    async def __aexit__(self, *exc):
+        self._semaphore.release()
+        self.pending -= 1
+
+
+pool = InferencePool(INFERENCE_POOL_WORKERS)
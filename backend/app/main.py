@@ -1,17 +1,59 @@
-from fastapi import FastAPI
-from fastapi.middleware.cors import CORSMiddleware
-from app.apis.api import router as cox_router
-from app.apis.apis_simple import router as bn_router
-
-app = FastAPI(title="NSMP Recurrence Risk Model")
-
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["http://localhost:5173", "http://localhost:3000"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-app.include_router(cox_router)
-app.include_router(bn_router)
\ No newline at end of file
+from contextlib import asynccontextmanager
+from fastapi import FastAPI
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
+from app.apis.api import router as cox_router
+from app.apis.apis_simple import router as bn_router
+from app.apis.admin import router as admin_router, ADMIN_TOKEN
+from app.registry import registry, MODEL_LOADING, MODEL_WATCH_INTERVAL
+from app.executor import pool
+from app.monitoring import RequestMetricsMiddleware
+from app.profiling import ProfilingMiddleware, PROFILING
+from src.monitoring.metrics import metrics
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if MODEL_LOADING == "eager":
+        registry.warm_up(background=False)
+    elif MODEL_LOADING == "background":
+        registry.warm_up()
+    if MODEL_WATCH_INTERVAL > 0:
+        registry.watch(MODEL_WATCH_INTERVAL)
+    pool.start()
+    yield
+    pool.shutdown()
+
+
+app = FastAPI(title="NSMP Recurrence Risk Model", lifespan=lifespan)
+
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["http://localhost:5173", "http://localhost:3000"],
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+app.add_middleware(RequestMetricsMiddleware)
+if PROFILING:
+    app.add_middleware(ProfilingMiddleware, admin_token=ADMIN_TOKEN)
+
+app.include_router(cox_router)
+app.include_router(bn_router)
+app.include_router(admin_router)
+
+
+@app.get("/ready")
+def ready():
+    """Readiness probe: 200 once every model is loaded, 503 before that."""
+    ready = registry.is_ready()
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={"ready": ready, "models": registry.status()},
+    )
+
+
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    """Request, inference-stage and BN query metrics in the Prometheus text format."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,116 @@
+import functools
+import inspect
+from contextvars import ContextVar
+from time import perf_counter
+
+from fastapi.routing import APIRoute
+
+from app.profiling import call_profiled
+from src.monitoring.metrics import REQUEST_SECONDS, REQUEST_PHASE_SECONDS
+
+# [received, endpoint called, endpoint returned, response started] of the current request
+_timings = ContextVar("request_timings", default=None)
+
+
+def _docs_paths(app):
+    """The OpenAPI schema and docs paths of a FastAPI app, or none for other apps."""
+    names = ("openapi_url", "docs_url", "redoc_url", "swagger_ui_oauth2_redirect_url")
+    return {url for url in (getattr(app, name, None) for name in names) if url}
+
+
+class RequestMetricsMiddleware:
+    """
+    Records each HTTP request's latency by method, route template and
+    status. For routes built with TimedRoute it also splits the time into
+    validate (body read, parsing and validation), endpoint and serialize
+    (from the endpoint returning to the response headers being sent).
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        timings = [perf_counter(), None, None, None]
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                timings[3] = perf_counter()
+            await send(message)
+
+        token = _timings.set(timings)
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            _timings.reset(token)
+            end = perf_counter()
+
+            # Route templates, not raw paths, keep the label set small. Anything
+            # answered without reaching a route (404s, CORS preflights) is
+            # "unmatched", except the docs FastAPI serves with plain starlette
+            # routes, which set no route in the scope
+            route = scope.get("route")
+            if route is not None:
+                path = route.path
+            elif scope["path"] in _docs_paths(scope.get("app")):
+                path = scope["path"]
+            else:
+                path = "unmatched"
+            method = scope["method"]
+            REQUEST_SECONDS.labels(method, path, status).observe(end - timings[0])
+
+            received, called, returned, started = timings
+            if called is not None and returned is not None:
+                REQUEST_PHASE_SECONDS.labels(method, path, "validate").observe(called - received)
+                REQUEST_PHASE_SECONDS.labels(method, path, "endpoint").observe(returned - called)
+                REQUEST_PHASE_SECONDS.labels(method, path, "serialize").observe((started or end) - returned)
+
+
+def _mark_endpoint(endpoint):
+    """Wrap an endpoint to record when it is called and when it returns."""
+    if getattr(endpoint, "_marks_timings", False):
+        return endpoint
+
+    if inspect.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def marked(*args, **kwargs):
+            timings = _timings.get()
+            if timings is not None:
+                timings[1] = perf_counter()
+            try:
+                return await endpoint(*args, **kwargs)
+            finally:
+                if timings is not None:
+                    timings[2] = perf_counter()
+    else:
+        @functools.wraps(endpoint)
+        def marked(*args, **kwargs):
+            # Runs on the threadpool, with a copy of the request's context,
+            # where the event loop's profiler does not see it
+            timings = _timings.get()
+            if timings is not None:
+                timings[1] = perf_counter()
+            try:
+                return call_profiled(endpoint, *args, **kwargs)
+            finally:
+                if timings is not None:
+                    timings[2] = perf_counter()
+
+    marked._marks_timings = True
+    return marked
+
+
+class TimedRoute(APIRoute):
+    """
+    APIRoute whose endpoint marks the request phases for
+    RequestMetricsMiddleware, and whose sync endpoints are profiled for
+    ProfilingMiddleware.
+    """
+
+    def __init__(self, path, endpoint, **kwargs):
+        super().__init__(path, _mark_endpoint(endpoint), **kwargs)
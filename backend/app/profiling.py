@@ -0,0 +1,232 @@
+import cProfile
+import hmac
+import io
+import itertools
+import marshal
+import os
+import pstats
+import random
+import sys
+import threading
+from collections import deque
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from time import perf_counter
+
+# Requests can only be profiled when this is set
+PROFILING = os.environ.get("PROFILING", "0") == "1"
+
+# Fraction of requests profiled without asking (0.01 = 1%); requests
+# sending "X-Profile: 1" and the admin token are profiled regardless
+PROFILE_SAMPLE_RATE = float(os.environ.get("PROFILE_SAMPLE_RATE", "0"))
+
+# Profiles kept for download from /admin/profiles
+PROFILE_BUFFER_SIZE = int(os.environ.get("PROFILE_BUFFER_SIZE", "20"))
+
+# The profile of the request being handled, if it is profiled
+_current = ContextVar("request_profile", default=None)
+
+# Profile ids, unique within the process as `profiles` is shared
+_ids = itertools.count(1)
+
+
+class _StatsDict:
+    """Profile stats received from a pool worker, in the form pstats.Stats loads."""
+
+    def __init__(self, stats):
+        self.stats = stats
+
+    def create_stats(self):
+        pass
+
+
+class RequestProfile:
+    """
+    cProfile data of one request: the event loop while it was in flight
+    (routing, validation, async handler, serialization) plus each sync
+    handler or inference call it ran on the threadpool or in a pool worker.
+    """
+
+    def __init__(self, id, method, path):
+        self.id = id
+        self.method = method
+        self.path = path
+        self.started = datetime.now(timezone.utc)
+        self.status = None
+        self.duration_ms = None
+        self.calls = 0
+        self.data = None
+        self._parts = []
+        self._lock = threading.Lock()
+
+    def add(self, profile):
+        """
+        Add a disabled cProfile.Profile, or the stats dict of one from a pool
+        worker; None counts a call the event loop's profiler already recorded.
+        """
+        if isinstance(profile, dict):
+            profile = _StatsDict(profile)
+        with self._lock:
+            if profile is not None:
+                self._parts.append(profile)
+            self.calls += 1
+
+    def finish(self, status, duration_ms):
+        """Merge the parts into one pstats dump; the profile is downloadable after this."""
+        self.status = status
+        self.duration_ms = round(duration_ms, 3)
+        stats = pstats.Stats(*self._parts)
+        self.data = marshal.dumps(stats.stats)
+        self._parts = []
+
+    def text(self, sort="cumulative", limit=50):
+        """The top `limit` functions as printed by pstats."""
+        stream = io.StringIO()
+        stats = pstats.Stats(_StatsDict(marshal.loads(self.data)), stream=stream)
+        stats.sort_stats(sort).print_stats(limit)
+        return stream.getvalue()
+
+    def summary(self):
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "status": self.status,
+            "started": self.started.isoformat(timespec="milliseconds"),
+            "duration_ms": self.duration_ms,
+            # The event loop's profile is not a call
+            "profiled_calls": self.calls - 1,
+        }
+
+
+class ProfileBuffer:
+    """The last `size` finished request profiles."""
+
+    def __init__(self, size):
+        self._profiles = deque(maxlen=size)
+
+    def add(self, profile):
+        self._profiles.append(profile)
+
+    def get(self, id):
+        for profile in list(self._profiles):
+            if profile.id == id:
+                return profile
+        return None
+
+    def summaries(self):
+        """Newest first."""
+        return [p.summary() for p in reversed(list(self._profiles))]
+
+
+profiles = ProfileBuffer(PROFILE_BUFFER_SIZE)
+
+
+def current_profile():
+    return _current.get()
+
+
+def _profiler_active():
+    """
+    Whether a profiler is running process-wide. From Python 3.12 cProfile
+    uses sys.monitoring: only one profiler can be enabled per process, and it
+    sees every thread.
+    """
+    monitoring = getattr(sys, "monitoring", None)
+    return monitoring is not None and monitoring.get_tool(monitoring.PROFILER_ID) is not None
+
+
+def call_profiled(fn, /, *args, **kwargs):
+    """fn(*args, **kwargs), profiled into the current request's profile if it has one."""
+    profile = _current.get()
+    if profile is None:
+        return fn(*args, **kwargs)
+    if _profiler_active():
+        # Enabling a second profiler would raise; the request's own one,
+        # started on the event loop, records this thread too
+        profile.add(None)
+        return fn(*args, **kwargs)
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        profiler.disable()
+        profile.add(profiler)
+
+
+def profile_stats(fn, /, *args, **kwargs):
+    """fn(*args, **kwargs) under cProfile; returns the result and the picklable stats."""
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        result = fn(*args, **kwargs)
+    finally:
+        profiler.disable()
+    profiler.create_stats()
+    return result, profiler.stats
+
+
+class ProfilingMiddleware:
+    """
+    Profiles requests that send "X-Profile: 1" with the admin token (the
+    header is ignored when no token is configured) and a random
+    `sample_rate` of the others, and keeps them in `profiles`. The response
+    carries the profile's id in X-Profile-Id.
+
+    One request is profiled at a time per process. The event loop is
+    shared, so its part of the profile also holds whatever other requests
+    did on the loop meanwhile; the threadpool and worker parts only hold
+    the profiled request's own calls. From Python 3.12 the event loop's
+    profiler is the only one in the process and records every thread, so
+    it also holds other requests' threadpool work.
+    """
+
+    def __init__(self, app, admin_token=None, sample_rate=PROFILE_SAMPLE_RATE):
+        self.app = app
+        self.admin_token = admin_token
+        self.sample_rate = sample_rate
+        self._running = False
+
+    def _selected(self, scope):
+        headers = dict(scope["headers"])
+        if headers.get(b"x-profile") in (b"1", b"true") and self.admin_token:
+            token = headers.get(b"x-admin-token", b"")
+            if hmac.compare_digest(token, self.admin_token.encode()):
+                return True
+        # Sampling admin and metrics calls would only push real traffic out of the buffer
+        if scope["path"].startswith(("/admin", "/metrics")):
+            return False
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or self._running or not self._selected(scope):
+            return await self.app(scope, receive, send)
+
+        profile = RequestProfile(next(_ids), scope["method"], scope["path"])
+        status = 500
+
+        async def send_with_id(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = [*message.get("headers", []), (b"x-profile-id", str(profile.id).encode())]
+                message = {**message, "headers": headers}
+            await send(message)
+
+        self._running = True
+        token = _current.set(profile)
+        profiler = cProfile.Profile()
+        start = perf_counter()
+        profiler.enable()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            profiler.disable()
+            duration_ms = (perf_counter() - start) * 1e3
+            _current.reset(token)
+            self._running = False
+            profile.add(profiler)
+            profile.finish(status, duration_ms)
+            profiles.add(profile)
@@ -0,0 +1,268 @@
+import hashlib
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+
+from fastapi import Response
+
+logger = logging.getLogger(__name__)
+
+MODEL_DIR = Path("model")
+
+# Files each model is read from, relative to its model directory
+MODEL_FILES = {
+    "cox": (
+        "cox_model.bin", "cox_model.pkl", "preprocess.json", "risk_thresholds.json",
+        "feature_importance.json", "km_curves.json",
+    ),
+    "bayesian": ("bayesian_network.pkl", "posterior_tables/index.json"),
+}
+
+
+def files_version(files):
+    """Short sha1 of the contents of the files that exist: the model version."""
+    digest = hashlib.sha1()
+    for f in files:
+        if f.exists():
+            digest.update(f.read_bytes())
+    return digest.hexdigest()[:12]
+
+
+class ArtifactRegistry:
+    """
+    Versioned model artifacts by name.
+
+    Models are loaded on first use or warmed in the background. A reload
+    builds and smoke-tests the new artifacts off to the side, then swaps the
+    live reference in one assignment; requests that already hold the old
+    artifacts finish on them.
+
+    Factories import their loaders lazily, so importing the app does not
+    unpickle lifelines/pgmpy models.
+    """
+
+    def __init__(self):
+        self._models = {}
+        self._artifacts = {}
+        self._errors = {}
+        self._load_seconds = {}
+        self._mtimes = {}
+        self._locks = {}
+        self._reload_locks = {}
+        self._watcher = None
+
+    def register(self, name, factory, files, smoke=None, warm=None):
+        """
+        factory() builds the artifacts, `files` are the paths they are read
+        from (used for versioning and change detection), smoke(artifacts)
+        raises if a freshly built model is unusable and warm(artifacts)
+        fills lazy caches before a reloaded model goes live.
+        """
+        self._models[name] = {
+            "factory": factory,
+            "files": [Path(f) for f in files],
+            "smoke": smoke,
+            "warm": warm,
+        }
+        self._locks[name] = threading.Lock()
+        self._reload_locks[name] = threading.Lock()
+
+    @property
+    def names(self):
+        return list(self._models)
+
+    def get(self, name):
+        """Return the live artifacts for `name`, loading them if needed."""
+        artifacts = self._artifacts.get(name)
+        if artifacts is None:
+            with self._locks[name]:
+                if name not in self._artifacts:
+                    self._artifacts[name] = self.build(name)
+            artifacts = self._artifacts[name]
+        return artifacts
+
+    def _fingerprint(self, name):
+        files = [f for f in self._models[name]["files"] if f.exists()]
+        return files_version(files), {f: f.stat().st_mtime_ns for f in files}
+
+    def disk_version(self, name):
+        """Version of the model's files as they are on disk now."""
+        return self._fingerprint(name)[0]
+
+    def build(self, name):
+        """Load, version and smoke-test a new set of artifacts, without making them live."""
+        model = self._models[name]
+        start = time.perf_counter()
+        version, mtimes = self._fingerprint(name)
+        try:
+            artifacts = model["factory"]()
+            artifacts.version = version
+            if model["smoke"] is not None:
+                model["smoke"](artifacts)
+        except Exception as e:
+            # Remember the files we tried so the watcher waits for the next change
+            self._errors[name] = repr(e)
+            self._mtimes[name] = mtimes
+            raise
+        self._errors.pop(name, None)
+        self._load_seconds[name] = time.perf_counter() - start
+        self._mtimes[name] = mtimes
+        return artifacts
+
+    def reload(self, name):
+        """
+        Build new artifacts and swap them in. On failure the live version
+        keeps serving and the error is reported in status().
+        """
+        with self._reload_locks[name]:
+            artifacts = self.build(name)
+            if self._models[name]["warm"] is not None:
+                self._models[name]["warm"](artifacts)
+            previous = self._artifacts.get(name)
+            self._artifacts[name] = artifacts
+        logger.info(
+            "Reloaded %s model: %s -> %s",
+            name, getattr(previous, "version", None), artifacts.version,
+        )
+        return artifacts
+
+    def reload_in_background(self, name):
+        """Start a reload unless one is already running."""
+        if self._reload_locks[name].locked():
+            return
+
+        def run():
+            try:
+                self.reload(name)
+            except Exception:
+                logger.exception("Reload of %s model failed", name)
+
+        threading.Thread(target=run, name=f"reload-{name}", daemon=True).start()
+
+    def changed(self, name):
+        """True if any of the model's files changed since it was loaded."""
+        loaded = self._mtimes.get(name)
+        if loaded is None:
+            return False
+        current = {
+            f: f.stat().st_mtime_ns
+            for f in self._models[name]["files"] if f.exists()
+        }
+        return current != loaded
+
+    def watch(self, interval):
+        """Poll the model files every `interval` seconds and reload on change."""
+        def run():
+            while True:
+                time.sleep(interval)
+                for name in self.names:
+                    if self.changed(name) and not self._reload_locks[name].locked():
+                        try:
+                            self.reload(name)
+                        except Exception:
+                            logger.exception("Reload of %s model failed", name)
+
+        if self._watcher is None:
+            self._watcher = threading.Thread(target=run, name="model-watcher", daemon=True)
+            self._watcher.start()
+
+    def warm_up(self, background=True):
+        """Load every registered model, in daemon threads unless background is False."""
+        def load(name):
+            try:
+                self.get(name)
+            except Exception:
+                pass  # recorded in status(); the next get() retries
+
+        if not background:
+            for name in self.names:
+                self.get(name)
+            return
+
+        for name in self.names:
+            threading.Thread(target=load, args=(name,), name=f"warm-{name}", daemon=True).start()
+
+    def is_ready(self, name=None):
+        names = [name] if name else self.names
+        return all(n in self._artifacts for n in names)
+
+    def status(self):
+        return {
+            name: {
+                "ready": name in self._artifacts,
+                "version": getattr(self._artifacts.get(name), "version", None),
+                "load_seconds": self._load_seconds.get(name),
+                "reloading": self._reload_locks[name].locked(),
+                "error": self._errors.get(name),
+            }
+            for name in self.names
+        }
+
+    def dependency(self, name):
+        """
+        FastAPI dependency that pins one version of the artifacts for the
+        whole request and reports it in the X-Model-Version header.
+        """
+        def get_artifacts(response: Response):
+            artifacts = self.get(name)
+            response.headers["X-Model-Version"] = artifacts.version
+            return artifacts
+
+        return get_artifacts
+
+
+def _load_cox():
+    from src.cox.model_loader import ModelArtifacts
+    return ModelArtifacts(MODEL_DIR)
+
+
+def _smoke_cox(artifacts):
+    import math
+    from src.cox.predict import predict_patient
+
+    result = predict_patient(dict(artifacts.medians), artifacts)
+    if not all(math.isfinite(result[k]) for k in ("risk_score", "dfs_prob_1y", "dfs_prob_5y")):
+        raise ValueError(f"Cox smoke prediction is not finite: {result}")
+
+
+def _load_bayesian():
+    from src.bn.model_loader_simple import ModelArtifacts
+    return ModelArtifacts(MODEL_DIR)
+
+
+def _smoke_bayesian(artifacts):
+    from src.bn.predict_simple import predict_flexible, TARGET_VAR
+
+    probs = predict_flexible([TARGET_VAR], {}, artifacts)["results"][TARGET_VAR]
+    if abs(sum(probs.values()) - 1) > 1e-6:
+        raise ValueError(f"Bayesian smoke prediction does not sum to 1: {probs}")
+
+
+def _warm_bayesian(artifacts):
+    # Render the graph now rather than on the first request after a swap
+    artifacts.graph_images.get("png")
+
+
+# "background" (default) warms models in threads at startup, "eager" blocks
+# startup until they are loaded, "lazy" waits for the first request
+MODEL_LOADING = os.environ.get("MODEL_LOADING", "background")
+
+# Seconds between checks of model/ for changed files; 0 disables watching
+MODEL_WATCH_INTERVAL = float(os.environ.get("MODEL_WATCH_INTERVAL", "0"))
+
+registry = ArtifactRegistry()
+registry.register(
+    "cox",
+    _load_cox,
+    files=[MODEL_DIR / f for f in MODEL_FILES["cox"]],
+    smoke=_smoke_cox,
+)
+registry.register(
+    "bayesian",
+    _load_bayesian,
+    files=[MODEL_DIR / f for f in MODEL_FILES["bayesian"]],
+    smoke=_smoke_bayesian,
+    warm=_warm_bayesian,
+)
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Dict
+from typing import Dict, Optional
 
 class PredictionOutput(BaseModel):
     risk_score: float
@@ -8,3 +8,7 @@ class PredictionOutput(BaseModel):
     dfs_prob_3y: float
     dfs_prob_5y: float
     top_contributors: Dict[str, float]
+    # Only with ?explain=true: every feature's contribution to log(risk_score)
+    # relative to the training-median patient, largest first
+    contributions: Optional[Dict[str, float]] = None
+    baseline_risk_score: Optional[float] = None
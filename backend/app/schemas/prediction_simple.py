@@ -1,7 +1,15 @@
 from pydantic import BaseModel
-from typing import Dict
+from typing import Dict, Optional
 
 class PredictionOutput(BaseModel):
     target: str
     probabilities: Dict[str, float]
     most_likely: str
+
+
+class BatchPredictionOutput(BaseModel):
+    """A PredictionOutput, or the error that kept the patient from being scored."""
+    target: str
+    probabilities: Optional[Dict[str, float]] = None
+    most_likely: Optional[str] = None
+    error: Optional[str] = None
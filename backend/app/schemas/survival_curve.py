@@ -0,0 +1,21 @@
+from pydantic import BaseModel, Field
+from typing import List, Optional
+from app.schemas.patient import PatientInput
+
+class SurvivalCurveInput(BaseModel):
+    patient: PatientInput
+    horizons: Optional[List[float]] = Field(
+        None,
+        description="Times (days) to evaluate survival at. If omitted, the full daily curve is returned"
+    )
+    step_days: int = Field(
+        1,
+        ge=1,
+        description="Spacing (days) of the dense curve when no horizons are given"
+    )
+
+
+class SurvivalCurveOutput(BaseModel):
+    risk_score: float
+    times: List[float]
+    survival: List[float]
@@ -0,0 +1,40 @@
+from pydantic import BaseModel, Field
+from typing import List, Optional, Union
+from app.schemas.patient import PatientInput
+
+class SweepAxis(BaseModel):
+    feature: str = Field(
+        ...,
+        description="PatientInput field to vary"
+    )
+    values: Optional[List[float]] = Field(
+        None,
+        min_length=1,
+        max_length=200,
+        description="Values to evaluate. If omitted, `num` evenly spaced values from `start` to `stop`"
+    )
+    start: Optional[float] = None
+    stop: Optional[float] = None
+    num: int = Field(20, ge=2, le=200)
+
+
+class SweepInput(BaseModel):
+    patient: PatientInput
+    axes: List[SweepAxis] = Field(
+        ...,
+        min_length=1,
+        max_length=2,
+        description="One axis for a curve, two for a grid"
+    )
+
+
+Grid = Union[List[float], List[List[float]]]
+
+class SweepOutput(BaseModel):
+    features: List[str]
+    values: List[List[float]]
+    risk_score: Grid
+    risk_group: Union[List[str], List[List[str]]]
+    dfs_prob_1y: Grid
+    dfs_prob_3y: Grid
+    dfs_prob_5y: Grid
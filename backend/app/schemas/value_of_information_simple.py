@@ -0,0 +1,40 @@
+from pydantic import BaseModel, Field
+from typing import Dict, List, Literal, Optional, Union
+
+
+class ValueOfInformationInput(BaseModel):
+    target: str = Field(
+        "recidiva",
+        description="Variable whose posterior the candidate observations would change"
+    )
+    evidence: Optional[Dict[str, Union[str, float, int]]] = Field(
+        None,
+        description="Known values (evidence) for variables in the network"
+    )
+    candidates: Optional[List[str]] = Field(
+        None,
+        description="Variables to rank; defaults to every unobserved node except the target"
+    )
+    rank_by: Literal["entropy", "shift"] = Field(
+        "entropy",
+        description="Rank by expected entropy reduction or by expected posterior shift"
+    )
+
+
+class Outcome(BaseModel):
+    probability: float
+    posterior: Optional[Dict[str, float]]
+
+
+class CandidateValue(BaseModel):
+    variable: str
+    expected_entropy_reduction: float
+    expected_posterior_shift: float
+    outcomes: Dict[str, Outcome]
+
+
+class ValueOfInformationOutput(BaseModel):
+    target: str
+    posterior: Dict[str, float]
+    entropy: float
+    ranking: List[CandidateValue]
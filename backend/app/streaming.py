@@ -0,0 +1,214 @@
+import codecs
+import csv
+import json
+
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+
+from app.executor import pool
+
+# Rows scored per predict_batch call; bounds memory regardless of upload size
+STREAM_CHUNK = 512
+
+# Characters in one line (or CSV record); longer ones are skipped and
+# reported, so a body without newlines cannot fill the memory
+MAX_LINE_LENGTH = 1 << 20
+
+STREAM_OPENAPI = {
+    "requestBody": {
+        "required": True,
+        "description": "One patient per line: NDJSON, or CSV with a header row (Content-Type: text/csv)",
+        "content": {
+            "application/x-ndjson": {"schema": {"type": "string"}},
+            "text/csv": {"schema": {"type": "string"}},
+        },
+    }
+}
+
+
+class BodyStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse whose generator is still reading the request body.
+
+    StreamingResponse listens for client disconnects by reading from the
+    ASGI receive channel (on servers older than ASGI spec 2.4), which would
+    swallow body chunks the generator has not read yet. Here the generator
+    is the only reader, and a disconnect surfaces as ClientDisconnect from
+    request.stream().
+    """
+
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+
+async def iter_lines(request):
+    """
+    Decoded lines of the request body, read as it arrives. A line longer
+    than MAX_LINE_LENGTH is dropped as it streams in and yielded as None.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    # Pieces of the current line, joined once it ends
+    parts = []
+    size = 0
+    too_long = False
+
+    def finish(tail):
+        nonlocal parts, size, too_long
+        line = None if too_long else "".join([*parts, tail]).rstrip("\r")
+        if line is not None and len(line) > MAX_LINE_LENGTH:
+            line = None
+        parts, size, too_long = [], 0, False
+        return line
+
+    async for chunk in request.stream():
+        *lines, rest = decoder.decode(chunk).split("\n")
+        for line in lines:
+            yield finish(line)
+        if not too_long:
+            parts.append(rest)
+            size += len(rest)
+            if size > MAX_LINE_LENGTH:
+                parts, too_long = [], True
+
+    rest = decoder.decode(b"", final=True)
+    if too_long or parts or rest:
+        line = finish(rest)
+        if line != "":
+            yield line
+
+
+async def iter_records(request):
+    """
+    (index, record, error) per non-blank line. CSV bodies (text/csv) take
+    column names from the first line and empty cells as missing; a quoted
+    cell may span lines. Anything else is parsed as NDJSON.
+    """
+    is_csv = request.headers.get("content-type", "").startswith("text/csv")
+    header = None
+    index = 0
+    # Lines of the CSV record so far, while a quoted cell is still open
+    pending = []
+    pending_size = 0
+    in_quotes = False
+    # Dropping the rest of a record that got too long
+    skipping = False
+    too_long = f"line longer than {MAX_LINE_LENGTH} characters"
+    async for line in iter_lines(request):
+        if is_csv:
+            if line is not None:
+                # An odd number of quotes opens or closes a quoted cell ("" escapes come in pairs)
+                in_quotes ^= line.count('"') % 2 == 1
+            if line is None or skipping:
+                if not skipping:
+                    yield index, None, too_long
+                    index += 1
+                pending, pending_size = [], 0
+                skipping = in_quotes
+                continue
+
+            pending.append(line)
+            pending_size += len(line) + 1
+            if in_quotes:
+                if pending_size > MAX_LINE_LENGTH:
+                    yield index, None, too_long
+                    index += 1
+                    pending, pending_size, skipping = [], 0, True
+                continue
+            line = "\n".join(pending)
+            pending, pending_size = [], 0
+        elif line is None:
+            yield index, None, too_long
+            index += 1
+            continue
+
+        if not line.strip():
+            continue
+
+        if is_csv:
+            cells = next(csv.reader([line]))
+            if header is None:
+                header = [c.strip() for c in cells]
+                continue
+            if len(cells) != len(header):
+                yield index, None, f"expected {len(header)} columns, got {len(cells)}"
+            else:
+                yield index, {k: (v if v != "" else None) for k, v in zip(header, cells)}, None
+        else:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                yield index, None, f"invalid JSON: {e}"
+            else:
+                if isinstance(record, dict):
+                    yield index, record, None
+                else:
+                    yield index, None, "expected a JSON object"
+        index += 1
+
+    if pending:
+        yield index, None, "unterminated quoted cell"
+
+
+async def _score_chunk(chunk, model, artifacts, predict_batch):
+    """NDJSON lines for one chunk of (index, patient dict or None, error)."""
+    valid = [(i, patient) for i, patient, error in chunk if error is None]
+    try:
+        scored = await pool.run(model, artifacts, predict_batch, [p for _, p in valid])
+        results = {i: result for (i, _), result in zip(valid, scored)}
+    except HTTPException:
+        # Scoring is unavailable (pool busy, restarting or replacing the
+        # model), not failing on a row: every retry would get the same 503
+        raise
+    except Exception:
+        # Score row by row so a failure is reported against its own row only
+        results = {}
+        for i, patient in valid:
+            try:
+                results[i] = (await pool.run(model, artifacts, predict_batch, [patient]))[0]
+            except Exception as e:
+                results[i] = e
+
+    lines = []
+    for i, _, error in chunk:
+        result = results.get(i, error)
+        if isinstance(result, dict):
+            lines.append(json.dumps({"index": i, **result}))
+        else:
+            message = result if isinstance(result, (str, list)) else f"{type(result).__name__}: {result}"
+            lines.append(json.dumps({"index": i, "error": message}))
+    return "\n".join(lines) + "\n"
+
+
+async def score_stream(request, schema, model, artifacts, predict_batch, limit):
+    """
+    Validate each uploaded row against `schema` and score the rows in
+    chunks of STREAM_CHUNK, yielding NDJSON results in input order.
+    Rows that fail to parse, validate or score get an "error" line instead.
+
+    If scoring becomes unavailable, the stream ends with one line holding
+    the error and its "status" but no "index"; the rows after the last
+    indexed line were not scored.
+    """
+    try:
+        async with limit:
+            chunk = []
+            async for index, record, error in iter_records(request):
+                patient = None
+                if error is None:
+                    try:
+                        patient = schema.model_validate(record).model_dump()
+                    except ValidationError as e:
+                        error = e.errors(include_url=False, include_context=False, include_input=False)
+                chunk.append((index, patient, error))
+
+                if len(chunk) == STREAM_CHUNK:
+                    yield await _score_chunk(chunk, model, artifacts, predict_batch)
+                    chunk = []
+
+            if chunk:
+                yield await _score_chunk(chunk, model, artifacts, predict_batch)
+    except HTTPException as e:
+        yield json.dumps({"error": e.detail, "status": e.status_code}) + "\n"
@@ -0,0 +1,82 @@
+"""
+Latency of the Bayesian-network inference engines.
+
+Compares VariableElimination (default) against the compiled junction tree
+for the single-target queries behind /bayesian/predict and
+/bayesian/predict-flexible. Multi-target queries run on the compiled
+junction tree whichever engine is configured, so they are timed once.
+The result cache is disabled so every call runs inference.
+
+Run from backend/:
+    python -m benchmarks.bn_engines [--n 200] [--seed 0]
+"""
+import argparse
+import random
+import statistics
+import time
+import warnings
+
+warnings.filterwarnings("ignore")
+
+from app.schemas.patient_simple import PatientInput
+from src.bn.model_loader_simple import ModelArtifacts, ENGINES
+from src.bn.predict_simple import predict_patient, predict_flexible
+
+
+def synthetic_patients(artifacts, n, seed):
+    """Patients drawn from the schema's allowed values that the network knows about."""
+    rng = random.Random(seed)
+    schema = PatientInput.model_json_schema()["properties"]
+    states = {n: set(artifacts.model.get_cpds(n).state_names[n]) for n in artifacts.nodes}
+
+    choices = {
+        field: [v for v in props["extra"]["allowed_values"] if v in states.get(field, ())]
+        for field, props in schema.items()
+    }
+    return [
+        {field: rng.choice(values) for field, values in choices.items() if values}
+        for _ in range(n)
+    ]
+
+
+def timed(fn, items):
+    samples = []
+    for item in items:
+        start = time.perf_counter()
+        fn(item)
+        samples.append((time.perf_counter() - start) * 1e3)
+    samples.sort()
+    return {
+        "median_ms": statistics.median(samples),
+        "p95_ms": samples[int(0.95 * (len(samples) - 1))],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n", type=int, default=200, help="Synthetic patients per case")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    for engine in ENGINES:
+        artifacts = ModelArtifacts(cache_size=0, engine=engine)
+        patients = synthetic_patients(artifacts, args.n, args.seed)
+
+        cases = {
+            "predict": lambda p: predict_patient(p, artifacts),
+        }
+        # Multi-target queries do not depend on the engine
+        sizes = (1, 10, len(artifacts.nodes)) if engine == "junction_tree" else (1,)
+        for k in sizes:
+            def flexible(p, k=k):
+                targets = [t for t in artifacts.nodes if t not in p][:k]
+                return predict_flexible(targets, p, artifacts)
+            cases[f"predict-flexible ({k} targets)"] = flexible
+
+        for name, fn in cases.items():
+            r = timed(fn, patients)
+            print(f"{engine:22s} {name:32s} median {r['median_ms']:8.2f} ms   p95 {r['p95_ms']:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
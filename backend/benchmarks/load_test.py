@@ -0,0 +1,134 @@
+"""
+Throughput and memory of `run.py --workers N` for increasing N.
+
+For every worker count it starts the server, waits for /ready, then drives
+/cox/predict and /bayesian/predict from several client processes for a
+fixed time. Reported per run:
+- requests/sec per endpoint
+- summed RSS of the server processes, and summed PSS where the kernel
+  exposes it. PSS splits shared pages between the processes that map them,
+  so it shows how much memory copy-on-write sharing saves.
+
+Run from backend/ (Linux):
+    python -m benchmarks.load_test [--workers 1 2 4] [--seconds 10] [--clients 8]
+"""
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+COX_PATIENT = {
+    "edad": 63, "imc": 29.6, "asa": 1, "grado_histologi": 2,
+    "tamano_tumoral": 2.8, "metasta_distan": 0, "FIGO2023": 1,
+}
+BN_PATIENT = {
+    "edad": "1.0", "imc": "2.0", "asa": "1.0", "grado_histologi": "1.0",
+    "tamano_tumoral": "1.0", "afectacion_linf": "0.0", "metasta_distan": "0.0",
+    "recep_est_porcent": "1.0", "rece_de_Ppor": "2.0",
+    "estudio_genetico_r01": "0.0", "FIGO2023": "1.0",
+}
+ENDPOINTS = {
+    "/cox/predict": COX_PATIENT,
+    "/bayesian/predict": BN_PATIENT,
+}
+
+
+def client(port, path, body, seconds, counter):
+    conn = http.client.HTTPConnection("127.0.0.1", port)
+    payload = json.dumps(body)
+    headers = {"Content-Type": "application/json"}
+    done = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        conn.request("POST", path, payload, headers)
+        resp = conn.getresponse()
+        resp.read()
+        if resp.status == 200:
+            done += 1
+    with counter.get_lock():
+        counter.value += done
+
+
+def server_memory_kb(root_pid):
+    """Summed (rss, pss) in kB of root_pid and its children."""
+    pids = [root_pid]
+    try:
+        with open(f"/proc/{root_pid}/task/{root_pid}/children") as f:
+            pids += [int(p) for p in f.read().split()]
+    except FileNotFoundError:
+        pass
+
+    rss = pss = 0
+    for pid in pids:
+        try:
+            with open(f"/proc/{pid}/smaps_rollup") as f:
+                for line in f:
+                    if line.startswith("Rss:"):
+                        rss += int(line.split()[1])
+                    elif line.startswith("Pss:"):
+                        pss += int(line.split()[1])
+        except FileNotFoundError:
+            pass
+    return rss, pss
+
+
+def wait_ready(port, timeout=180):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/ready") as r:
+                if r.status == 200:
+                    return
+        except (urllib.error.URLError, ConnectionError):
+            pass
+        time.sleep(0.2)
+    raise TimeoutError("server did not become ready")
+
+
+def run(workers, port, seconds, clients):
+    proc = subprocess.Popen(
+        [sys.executable, "run.py", "--workers", str(workers), "--port", str(port)],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_ready(port)
+        result = {"workers": workers}
+        for path, body in ENDPOINTS.items():
+            counter = multiprocessing.Value("i", 0)
+            procs = [
+                multiprocessing.Process(target=client, args=(port, path, body, seconds, counter))
+                for _ in range(clients)
+            ]
+            for p in procs:
+                p.start()
+            for p in procs:
+                p.join()
+            result[f"{path} rps"] = counter.value / seconds
+        result["rss_mb"], result["pss_mb"] = (v / 1024 for v in server_memory_kb(proc.pid))
+        return result
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--clients", type=int, default=8, help="Concurrent client processes")
+    parser.add_argument("--port", type=int, default=8766)
+    args = parser.parse_args()
+
+    print(f"{os.cpu_count()} CPUs")
+    results = [run(w, args.port, args.seconds, args.clients) for w in args.workers]
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
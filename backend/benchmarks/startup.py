@@ -0,0 +1,77 @@
+"""
+Import time and time-to-first-response of the API.
+
+- import: wall time of `import app.main` in a fresh interpreter
+- first response: time from launching uvicorn until /cox/schema answers
+- warm: time from launching uvicorn until /ready reports every model loaded
+
+Run from backend/:
+    python -m benchmarks.startup [--repeat 3] [--port 8765]
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+
+def import_seconds():
+    code = "import time; t = time.perf_counter(); import app.main; print(time.perf_counter() - t)"
+    out = subprocess.run(
+        [sys.executable, "-W", "ignore", "-c", code],
+        check=True, capture_output=True, text=True,
+    )
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def wait_for(url, timeout, accept=(200,)):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        try:
+            with urllib.request.urlopen(url) as r:
+                if r.status in accept:
+                    return
+        except (urllib.error.URLError, ConnectionError):
+            pass
+        time.sleep(0.01)
+    raise TimeoutError(url)
+
+
+def server_seconds(port, timeout=120):
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_for(f"http://127.0.0.1:{port}/cox/schema", timeout)
+        first = time.perf_counter() - start
+        wait_for(f"http://127.0.0.1:{port}/ready", timeout)
+        warm = time.perf_counter() - start
+    finally:
+        proc.terminate()
+        proc.wait()
+    return first, warm
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    imports = [import_seconds() for _ in range(args.repeat)]
+    servers = [server_seconds(args.port) for _ in range(args.repeat)]
+
+    print(json.dumps({
+        "import_s": statistics.median(imports),
+        "first_response_s": statistics.median(s[0] for s in servers),
+        "models_warm_s": statistics.median(s[1] for s in servers),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
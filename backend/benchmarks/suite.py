@@ -0,0 +1,285 @@
+"""
+Latency of every inference path, against the bundled model/ artifacts.
+
+Cases:
+- cox: preprocess_one, FeatureEncoder.encode, predict_patient
+- bayesian: predict_patient and single-target predict_flexible per
+  inference engine, predict_flexible with 10 and all targets on the
+  junction tree that answers them (result cache and posterior tables off),
+  predict_patient through the posterior tables when they are compiled,
+  and rendering the graph image
+- http: requests through FastAPI's TestClient, as served (caches on)
+
+Patients are drawn from the schema constraints with a fixed seed. Results
+are written as JSON; --baseline compares them with an earlier run and
+exits 1 if any case's median got slower by more than --threshold, or if a
+baseline case that this run's --groups and --match select is missing.
+
+Run from backend/:
+    python -m benchmarks.suite [--n 200] [--output results.json]
+    python -m benchmarks.suite --baseline results.json [--threshold 1.3]
+    python -m benchmarks.suite --compare old.json new.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+import warnings
+from datetime import datetime, timezone
+from importlib.metadata import PackageNotFoundError, version
+from pathlib import Path
+
+warnings.filterwarnings("ignore")
+
+RESULTS_DIR = Path(__file__).parent / "results"
+
+# Medians this close are equal whatever their ratio; timer and scheduler
+# noise dominates microsecond cases
+NOISE_FLOOR_MS = 0.005
+
+PACKAGES = ("numpy", "pandas", "pgmpy", "lifelines", "fastapi", "pydantic", "starlette")
+
+
+def cox_patients(n, seed):
+    """Cox patients drawn from the schema: allowed values, min/max ranges, optional fields sometimes missing."""
+    from app.schemas.patient import PatientInput
+
+    rng = random.Random(seed)
+    schema = PatientInput.model_json_schema()
+    required = set(schema.get("required", []))
+
+    def draw(props):
+        extra = props.get("extra", {})
+        types = [props["type"]] if "type" in props else [a["type"] for a in props["anyOf"]]
+        if "allowed_values" in extra:
+            return rng.choice(extra["allowed_values"])
+        low = extra.get("min", 0)
+        # Fields without a maximum (sizes, node counts) get a small range
+        high = extra.get("max", low + 10)
+        return rng.randint(low, high) if "integer" in types else round(rng.uniform(low, high), 1)
+
+    return [
+        {
+            name: draw(props) if name in required or rng.random() < 0.8 else None
+            for name, props in schema["properties"].items()
+        }
+        for _ in range(n)
+    ]
+
+
+def bn_patients(artifacts, n, seed):
+    from benchmarks.bn_engines import synthetic_patients
+    return synthetic_patients(artifacts, n, seed)
+
+
+def timed(fn, items, warmup=5):
+    """Latency statistics in milliseconds of fn over items, after a few warm-up calls."""
+    for item in items[:warmup]:
+        fn(item)
+
+    samples = []
+    for item in items:
+        start = time.perf_counter()
+        fn(item)
+        samples.append((time.perf_counter() - start) * 1e3)
+    samples.sort()
+    return {
+        "n": len(samples),
+        "min_ms": samples[0],
+        "median_ms": statistics.median(samples),
+        "mean_ms": statistics.fmean(samples),
+        "p95_ms": samples[int(0.95 * (len(samples) - 1))],
+    }
+
+
+def cox_cases(n, seed):
+    from src.cox.model_loader import ModelArtifacts
+    from src.cox.preprocessing import preprocess_one
+    from src.cox.predict import predict_patient
+
+    artifacts = ModelArtifacts("model")
+    patients = cox_patients(n, seed)
+    yield "cox.preprocess_one", lambda p: preprocess_one(p, artifacts), patients
+    yield "cox.encoder", artifacts.encoder.encode, patients
+    yield "cox.predict_patient", lambda p: predict_patient(p, artifacts), patients
+
+
+def bn_cases(n, seed):
+    from src.bn.graph_image import render_graph
+    from src.bn.model_loader_simple import ENGINES, ModelArtifacts
+    from src.bn.posterior_table import PosteriorTables
+    from src.bn.predict_simple import predict_flexible, predict_patient
+
+    for engine in ENGINES:
+        artifacts = ModelArtifacts("model", cache_size=0, engine=engine)
+        tables, artifacts.posterior_tables = artifacts.posterior_tables, PosteriorTables()
+        patients = bn_patients(artifacts, n, seed)
+
+        yield f"bn.predict_patient[{engine}]", lambda p, a=artifacts: predict_patient(p, a), patients
+        # Multi-target queries run on the junction tree whatever the engine
+        sizes = (1, 10, len(artifacts.nodes)) if engine == "junction_tree" else (1,)
+        for k in sizes:
+            # All nodes as targets leaves nothing to observe
+            evidence = patients if k < len(artifacts.nodes) else [{}] * n
+
+            def flexible(p, a=artifacts, k=k):
+                targets = [t for t in a.nodes if t not in p][:k]
+                return predict_flexible(targets, p, a)
+            yield f"bn.predict_flexible[{engine}, {k} targets]", flexible, evidence
+
+    if len(tables):
+        artifacts.posterior_tables = tables
+        yield "bn.predict_patient[posterior table]", lambda p: predict_patient(p, artifacts), patients
+
+    edges = artifacts.edges
+    yield "bn.render_graph[png]", lambda _: render_graph(edges, "png"), [None] * max(n // 20, 5)
+
+
+def http_cases(n, seed):
+    os.environ.setdefault("MODEL_LOADING", "eager")
+    from fastapi.testclient import TestClient
+    from app.main import app
+    from app.registry import registry
+
+    cox = cox_patients(n, seed)
+
+    with TestClient(app) as client:
+        bn = bn_patients(registry.get("bayesian"), n, seed)
+        etag = client.get("/bayesian/graph-image").headers["etag"]
+
+        def post(path):
+            def call(body):
+                response = client.post(path, json=body)
+                response.raise_for_status()
+            return call
+
+        yield "http POST /cox/predict", post("/cox/predict"), cox
+        yield "http POST /cox/predict-batch (50)", post("/cox/predict-batch"), [cox[i:i + 50] for i in range(0, n, 50)] * 5
+        yield "http POST /bayesian/predict", post("/bayesian/predict"), bn
+        yield "http POST /bayesian/predict-flexible", post("/bayesian/predict-flexible"), [
+            {"targets": ["recidiva"], "evidence": p} for p in bn
+        ]
+        yield "http GET /bayesian/graph-image", lambda _: client.get("/bayesian/graph-image"), [None] * n
+        yield "http GET /bayesian/graph-image (304)", lambda _: client.get(
+            "/bayesian/graph-image", headers={"If-None-Match": etag}
+        ), [None] * n
+
+
+GROUPS = {"cox": cox_cases, "bayesian": bn_cases, "http": http_cases}
+
+
+def environment():
+    versions = {}
+    for package in PACKAGES:
+        try:
+            versions[package] = version(package)
+        except PackageNotFoundError:
+            versions[package] = None
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "packages": versions,
+    }
+
+
+def run(groups, n, seed, match):
+    results = {}
+    for group in groups:
+        for name, fn, items in GROUPS[group](n, seed):
+            if match and match not in name:
+                continue
+            results[name] = {"group": group, **timed(fn, items)}
+            r = results[name]
+            print(f"{name:52s} median {r['median_ms']:9.3f} ms   p95 {r['p95_ms']:9.3f} ms", flush=True)
+    return results
+
+
+def compare(baseline, current, threshold):
+    """
+    Print median ratios of the cases both runs have; return the names that
+    regressed and the baseline cases this run selected but did not produce
+    (renamed, removed or no longer set up).
+    """
+    groups = current.get("groups")
+    match = current.get("match")
+    missing = [
+        name for name, base in baseline["cases"].items()
+        if name not in current["cases"]
+        and (groups is None or base.get("group") is None or base["group"] in groups)
+        and (not match or match in name)
+    ]
+    for name in missing:
+        print(f"{name:52s} {baseline['cases'][name]['median_ms']:9.3f} -> {'':>9s}     MISSING")
+
+    regressed = []
+    for name, r in current["cases"].items():
+        base = baseline["cases"].get(name)
+        if base is None:
+            continue
+        ratio = r["median_ms"] / base["median_ms"] if base["median_ms"] else float("inf")
+        slower = ratio > threshold and r["median_ms"] - base["median_ms"] > NOISE_FLOOR_MS
+        if slower:
+            regressed.append(name)
+        print(f"{name:52s} {base['median_ms']:9.3f} -> {r['median_ms']:9.3f} ms  x{ratio:5.2f}{'  REGRESSION' if slower else ''}")
+    return regressed, missing
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--n", type=int, default=200, help="Synthetic patients per case")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--groups", nargs="+", choices=sorted(GROUPS), default=list(GROUPS))
+    parser.add_argument("--match", help="Only run cases whose name contains this")
+    parser.add_argument("--output", help="Results file (default: benchmarks/results/<UTC time>.json)")
+    parser.add_argument("--baseline", help="Earlier results to check this run against")
+    parser.add_argument("--compare", nargs=2, metavar=("BASELINE", "CURRENT"), help="Check two results files without running")
+    parser.add_argument("--threshold", type=float, default=1.3, help="Slowest allowed ratio of medians to the baseline")
+    args = parser.parse_args()
+
+    if args.compare:
+        with open(args.compare[0]) as f:
+            baseline = json.load(f)
+        with open(args.compare[1]) as f:
+            current = json.load(f)
+    else:
+        started = datetime.now(timezone.utc)
+        current = {
+            "started": started.isoformat(timespec="seconds"),
+            "n": args.n,
+            "seed": args.seed,
+            "environment": environment(),
+            "groups": args.groups,
+            "match": args.match,
+            "cases": run(args.groups, args.n, args.seed, args.match),
+        }
+
+        output = Path(args.output) if args.output else RESULTS_DIR / f"{started:%Y%m%dT%H%M%SZ}.json"
+        output.parent.mkdir(parents=True, exist_ok=True)
+        with open(output, "w") as f:
+            json.dump(current, f, indent=2)
+        print(f"wrote {output}")
+
+        if not args.baseline:
+            return
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    print()
+    regressed, missing = compare(baseline, current, args.threshold)
+    failures = []
+    if missing:
+        failures.append(f"{len(missing)} baseline case(s) missing from this run: {', '.join(missing)}")
+    if regressed:
+        failures.append(f"{len(regressed)} case(s) slower than x{args.threshold} the baseline: {', '.join(regressed)}")
+    if failures:
+        sys.exit("\n".join(failures))
+    print(f"no case slower than x{args.threshold} the baseline or missing from this run")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,95 @@
-import uvicorn
-import argparse
-
-if __name__ == "__main__":
-    parser = argparse.ArgumentParser()
-    parser.add_argument("--port", type=int, default=8000, help="Port to run the server on")
-    parser.add_argument("--reload", action="store_true", help="Watch file changes")
-    args = parser.parse_args()
-
-    uvicorn.run(
-        "app.main:app",
-        host="127.0.0.1",
-        # host="0.0.0.0", # If run inside a docker container
-        port=args.port,
-        reload=args.reload,
-        access_log=True,
-        log_level="info",
-    )
\ No newline at end of file
+import uvicorn
+import argparse
+import os
+import signal
+import socket
+
+
+def serve_prefork(host, port, workers):
+    """
+    Load every model once in this process, then fork `workers` uvicorn
+    servers that share the listening socket. Model memory is inherited
+    copy-on-write, so resident memory stays roughly flat as workers are added.
+    """
+    # One BLAS thread per worker; the processes are the parallelism
+    for var in ("OPENBLAS_NUM_THREADS", "OMP_NUM_THREADS", "MKL_NUM_THREADS"):
+        os.environ.setdefault(var, "1")
+
+    import gc
+    from app.main import app
+    from app.registry import registry
+
+    registry.warm_up(background=False)
+
+    # Keep the loaded objects out of future collections so the cycle
+    # collector does not write to (and un-share) their pages in the children
+    gc.collect()
+    gc.freeze()
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+
+    config = uvicorn.Config(app, host=host, port=port, access_log=True, log_level="info")
+
+    def spawn():
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            uvicorn.Server(config).run(sockets=[sock])
+            os._exit(0)
+        return pid
+
+    children = {spawn() for _ in range(workers)}
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    # Replace workers that die unexpectedly until asked to stop
+    while children:
+        try:
+            pid, _ = os.wait()
+        except ChildProcessError:
+            break
+        children.discard(pid)
+        if not stopping:
+            children.add(spawn())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8000, help="Port to run the server on")
+    parser.add_argument("--reload", action="store_true", help="Watch file changes")
+    parser.add_argument("--host", default="127.0.0.1", help="Interface to bind (0.0.0.0 inside a docker container)")
+    parser.add_argument(
+        "--workers", type=int, default=1,
+        help="Number of worker processes. Above 1, models are loaded once and shared by fork (Linux/macOS)"
+    )
+    args = parser.parse_args()
+
+    if args.workers > 1:
+        if args.reload:
+            parser.error("--reload cannot be combined with --workers")
+        serve_prefork(args.host, args.port, args.workers)
+    else:
+        uvicorn.run(
+            "app.main:app",
+            host=args.host,
+            port=args.port,
+            reload=args.reload,
+            access_log=True,
+            log_level="info",
+        )
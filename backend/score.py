@@ -0,0 +1,264 @@
+"""
+Offline batch scoring of a Parquet or CSV file of patients.
+
+    python score.py patients.parquet scores/ --model cox
+    python score.py patients.csv scores/ --model bayesian --workers 8
+    python score.py patients.parquet scores/ --model cox --resume
+
+Input columns are the fields of the model's PatientInput (raw values for
+cox, discretized states for bayesian). The file is read in chunks of
+--chunk-size rows; chunks are scored on a process pool and each one is
+written as scores/part-NNNNN.parquet, so the output directory reads back as
+one Parquet dataset. Finished chunks are recorded in scores/_checkpoint.json
+and skipped by --resume after a failure or interruption. --resume refuses
+to continue if the input, the settings, the model directory or the model
+files have changed since the run started.
+
+Requires pyarrow.
+"""
+import os
+
+# One BLAS thread per process; the pool is the parallelism
+for var in ("OPENBLAS_NUM_THREADS", "OMP_NUM_THREADS", "MKL_NUM_THREADS"):
+    os.environ.setdefault(var, "1")
+
+import argparse
+import json
+import sys
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+CHECKPOINT = "_checkpoint.json"
+
+_artifacts = None
+
+
+def require_pyarrow():
+    try:
+        import pyarrow  # noqa: F401
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        sys.exit("score.py reads and writes Parquet with pyarrow: pip install pyarrow")
+
+
+def read_chunks(path, chunk_size, model):
+    """DataFrames of chunk_size rows; chunk boundaries are stable across runs."""
+    path = Path(path)
+    if path.suffix == ".parquet":
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    elif path.suffix == ".csv":
+        # BN states are strings such as "1.0"; keep them as written
+        dtype = str if model == "bayesian" else None
+        yield from pd.read_csv(path, chunksize=chunk_size, dtype=dtype)
+    else:
+        raise ValueError(f"Unsupported input '{path}', expected .parquet or .csv")
+
+
+def _init_worker(model, model_dir):
+    global _artifacts
+    if model == "cox":
+        from src.cox.model_loader import ModelArtifacts
+    else:
+        from src.bn.model_loader_simple import ModelArtifacts
+    _artifacts = ModelArtifacts(model_dir)
+
+
+def model_version(model, model_dir):
+    """The version the API would report for the model files in model_dir."""
+    from app.registry import MODEL_FILES, files_version
+    return files_version([Path(model_dir) / f for f in MODEL_FILES[model]])
+
+
+def score_cox(df, artifacts):
+    from src.cox.preprocessing import preprocess_frame
+    from src.cox.risk import risk_groups_from_scores
+
+    cox = artifacts.compiled
+    X = preprocess_frame(df, artifacts).to_numpy(dtype=float)
+    scores = cox.partial_hazard(X)
+    surv = cox.dfs_probabilities(scores)
+
+    return pd.DataFrame({
+        "risk_score": scores,
+        "risk_group": risk_groups_from_scores(scores, artifacts.thresholds),
+        "dfs_prob_1y": surv[:, 0],
+        "dfs_prob_3y": surv[:, 1],
+        "dfs_prob_5y": surv[:, 2],
+    })
+
+
+def score_bayesian(df, artifacts):
+    """
+    Posterior of the target per row, with the evidence prepared as
+    predict_patient prepares it. Each distinct evidence combination is
+    propagated once; rows with a state the network does not know get an
+    error instead of probabilities.
+    """
+    from app.schemas.patient_simple import PatientInput
+    from src.bn.predict_simple import TARGET_VAR, BATCH_CHUNK
+
+    # Like the API, every input field is evidence and absent values are "Missing"
+    jt = artifacts.junction_tree
+    columns = [c for c in PatientInput.model_fields if c in jt.state_index]
+    evidence = df.reindex(columns=columns).astype(object)
+    evidence = evidence.where(evidence.notna(), "Missing").astype(str)
+
+    if columns:
+        codes = evidence.groupby(columns, sort=False).ngroup().to_numpy()
+        unique = evidence.drop_duplicates().to_dict("records")
+    else:
+        codes = np.zeros(len(df), dtype=int)
+        unique = [{}]
+
+    states = jt.states[TARGET_VAR]
+    probs = np.full((len(unique), len(states)), np.nan)
+    errors = np.full(len(unique), None, dtype=object)
+
+    for i, ev in enumerate(unique):
+        errors[i] = jt.unknown_state(ev)
+    valid = np.array([e is None for e in errors])
+
+    rows = np.flatnonzero(valid)
+    for start in range(0, len(rows), BATCH_CHUNK):
+        chunk = rows[start:start + BATCH_CHUNK]
+        probs[chunk] = jt.query_arrays([TARGET_VAR], [unique[i] for i in chunk])[TARGET_VAR]
+
+    most_likely = np.full(len(unique), None, dtype=object)
+    most_likely[valid] = np.asarray(states, dtype=object)[probs[valid].argmax(axis=1)]
+
+    out = pd.DataFrame(probs[codes], columns=[f"{TARGET_VAR}_{s}" for s in states])
+    out["most_likely"] = most_likely[codes]
+    out["error"] = errors[codes]
+    return out
+
+
+SCORERS = {"cox": score_cox, "bayesian": score_bayesian}
+
+
+def score_chunk(index, first_row, df, model, out_dir, id_column):
+    """Score one chunk and write it as part-<index>.parquet."""
+    scored = SCORERS[model](df.reset_index(drop=True), _artifacts)
+    scored.insert(0, "row", np.arange(first_row, first_row + len(df)))
+    if id_column:
+        scored.insert(0, id_column, df[id_column].to_numpy())
+
+    part = out_dir / f"part-{index:05d}.parquet"
+    tmp = part.with_suffix(".tmp")
+    scored.to_parquet(tmp, index=False)
+    os.replace(tmp, part)
+    return index, len(df)
+
+
+def load_checkpoint(out_dir, settings, resume):
+    path = out_dir / CHECKPOINT
+    if not path.exists():
+        return set()
+    if not resume:
+        sys.exit(f"{out_dir} already holds a scoring run; pass --resume to continue it")
+
+    with open(path) as f:
+        checkpoint = json.load(f)
+    previous = checkpoint["settings"]
+    changed = sorted(k for k in settings.keys() | previous.keys() if settings.get(k) != previous.get(k))
+    if changed:
+        sys.exit(f"--resume settings differ from the checkpoint ({', '.join(changed)}): {previous}")
+    return set(checkpoint["done"])
+
+
+def save_checkpoint(out_dir, settings, done):
+    path = out_dir / CHECKPOINT
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "w") as f:
+        json.dump({"settings": settings, "done": sorted(done)}, f)
+    os.replace(tmp, path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", help="Parquet or CSV file of patients")
+    parser.add_argument("output", help="Directory for the Parquet parts and the checkpoint")
+    parser.add_argument("--model", choices=sorted(SCORERS), default="cox")
+    parser.add_argument("--model-dir", default="model")
+    parser.add_argument("--chunk-size", type=int, default=100_000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Scoring processes; 0 scores in this process")
+    parser.add_argument("--id-column", help="Input column copied to the output next to the row number")
+    parser.add_argument("--resume", action="store_true", help="Skip chunks finished by a previous run")
+    args = parser.parse_args()
+
+    require_pyarrow()
+
+    out_dir = Path(args.output)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    settings = {
+        "input": str(Path(args.input).resolve()),
+        "model": args.model,
+        # Parts scored by another model must not be joined to this run's
+        "model_dir": str(Path(args.model_dir).resolve()),
+        "model_version": model_version(args.model, args.model_dir),
+        "chunk_size": args.chunk_size,
+        "id_column": args.id_column,
+    }
+    done = load_checkpoint(out_dir, settings, args.resume)
+
+    def chunks():
+        first_row = 0
+        for index, df in enumerate(read_chunks(args.input, args.chunk_size, args.model)):
+            if index not in done:
+                yield index, first_row, df
+            first_row += len(df)
+
+    failed = []
+    rows = 0
+
+    def finished(index, n):
+        nonlocal rows
+        done.add(index)
+        rows += n
+        save_checkpoint(out_dir, settings, done)
+        print(f"chunk {index}: {n} rows", flush=True)
+
+    def collect(futures):
+        for future in futures:
+            try:
+                finished(*future.result())
+            except Exception as e:
+                failed.append(futures[future])
+                print(f"chunk {futures[future]} failed: {e!r}", file=sys.stderr)
+
+    if args.workers == 0:
+        _init_worker(args.model, args.model_dir)
+        for index, first_row, df in chunks():
+            try:
+                finished(*score_chunk(index, first_row, df, args.model, out_dir, args.id_column))
+            except Exception as e:
+                failed.append(index)
+                print(f"chunk {index} failed: {e!r}", file=sys.stderr)
+    else:
+        with ProcessPoolExecutor(
+            max_workers=args.workers,
+            initializer=_init_worker,
+            initargs=(args.model, args.model_dir),
+        ) as executor:
+            # At most two chunks per worker in flight keeps memory bounded
+            pending = {}
+            for index, first_row, df in chunks():
+                future = executor.submit(score_chunk, index, first_row, df, args.model, out_dir, args.id_column)
+                pending[future] = index
+                if len(pending) >= 2 * args.workers:
+                    completed, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    collect({f: pending.pop(f) for f in completed})
+            collect(pending)
+
+    print(f"scored {rows} rows into {out_dir}")
+    if failed:
+        sys.exit(f"chunks {sorted(failed)} failed; rerun with --resume to retry them")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,261 @@
+import networkx as nx
+import numpy as np
+
+
+def build_clique_tree(model):
+    """
+    Triangulate the moral graph of `model` and join its maximal cliques into
+    a junction tree (a forest when the network has disconnected parts).
+
+    Returns (cliques, tree, family_clique): the cliques as tuples of
+    variables, an nx.Graph over clique indices, and for every node the index
+    of a clique that holds its CPD (node + parents).
+    """
+    cards = {n: model.get_cardinality(n) for n in model.nodes()}
+
+    # Moral graph: parent-child edges plus edges between co-parents
+    moral = nx.Graph()
+    moral.add_nodes_from(model.nodes())
+    for node in model.nodes():
+        parents = list(model.get_parents(node))
+        moral.add_edges_from((p, node) for p in parents)
+        moral.add_edges_from(
+            (a, b) for i, a in enumerate(parents) for b in parents[i + 1:]
+        )
+
+    def fill_in(graph, node):
+        nbrs = list(graph.neighbors(node))
+        return sum(
+            not graph.has_edge(a, b)
+            for i, a in enumerate(nbrs) for b in nbrs[i + 1:]
+        )
+
+    def weight(graph, node):
+        return np.prod([cards[n] for n in graph.neighbors(node)]) * cards[node]
+
+    # Greedy min-fill elimination, ties broken by clique weight
+    graph = moral.copy()
+    cliques = []
+    while graph:
+        node = min(graph.nodes, key=lambda n: (fill_in(graph, n), weight(graph, n)))
+        nbrs = list(graph.neighbors(node))
+        graph.add_edges_from(
+            (a, b) for i, a in enumerate(nbrs) for b in nbrs[i + 1:]
+        )
+        graph.remove_node(node)
+
+        clique = frozenset([node, *nbrs])
+        if not any(clique <= c for c in cliques):
+            cliques.append(clique)
+
+    # Maximum-weight spanning tree over separator sizes is a junction tree
+    clique_graph = nx.Graph()
+    clique_graph.add_nodes_from(range(len(cliques)))
+    for i, a in enumerate(cliques):
+        for j in range(i + 1, len(cliques)):
+            sep = len(a & cliques[j])
+            if sep:
+                clique_graph.add_edge(i, j, weight=sep)
+    tree = nx.maximum_spanning_tree(clique_graph)
+
+    family_clique = {}
+    for node in model.nodes():
+        family = {node, *model.get_parents(node)}
+        family_clique[node] = min(
+            (i for i, c in enumerate(cliques) if family <= c),
+            key=lambda i: len(cliques[i]),
+        )
+
+    return [tuple(sorted(c)) for c in cliques], tree, family_clique
+
+
+class CompiledJunctionTree:
+    """
+    Junction tree compiled to NumPy once, at model load.
+
+    CPDs are pre-multiplied into one potential array per clique and the
+    message schedule is fixed, so a query only multiplies in evidence
+    indicators and runs the two propagation passes with np.einsum.
+
+    Every array carries a leading batch axis, so several evidence sets can
+    be propagated together.
+    """
+
+    def __init__(self, model):
+        self.cliques, self.tree, family_clique = build_clique_tree(model)
+
+        self.states = {
+            n: list(model.get_cpds(n).state_names[n]) for n in model.nodes()
+        }
+        self.state_index = {
+            n: {s: i for i, s in enumerate(states)}
+            for n, states in self.states.items()
+        }
+
+        # Integer einsum labels; 0 is reserved for the batch axis
+        self.labels = {n: i + 1 for i, n in enumerate(model.nodes())}
+        self.batch = 0
+
+        self.potentials = []
+        for idx, clique in enumerate(self.cliques):
+            shape = [len(self.states[v]) for v in clique]
+            operands = [np.ones(shape), self._sub(clique)]
+            for node, home in family_clique.items():
+                if home == idx:
+                    phi = model.get_cpds(node).to_factor()
+                    operands += [self._canonical_values(phi), self._sub(phi.variables)]
+            pot = np.einsum(*operands, self._sub(clique))
+            self.potentials.append(np.ascontiguousarray(pot, dtype=np.float64))
+
+        # Evidence on a variable is entered in the smallest clique holding it
+        self.var_clique = {
+            n: min(
+                (i for i, c in enumerate(self.cliques) if n in c),
+                key=lambda i: len(self.cliques[i]),
+            )
+            for n in model.nodes()
+        }
+
+        self.schedule = []
+        for component in nx.connected_components(self.tree):
+            root = min(component)
+            edges = list(nx.bfs_edges(self.tree, root))
+            self.schedule += [(child, parent) for parent, child in reversed(edges)]
+            self.schedule += edges
+
+        self.separators = {
+            (a, b): [v for v in self.cliques[a] if v in self.cliques[b]]
+            for a, b in self.schedule
+        }
+
+    def _sub(self, variables):
+        return [self.labels[v] for v in variables]
+
+    def _canonical_values(self, phi):
+        """Factor values with every axis in the variable's own state order."""
+        values = phi.values
+        for axis, var in enumerate(phi.variables):
+            order = [phi.state_names[var].index(s) for s in self.states[var]]
+            if order != list(range(len(order))):
+                values = np.take(values, order, axis=axis)
+        return values
+
+    def unknown_state(self, evidence):
+        """Error message for the first observed state the network does not know, or None."""
+        for var, state in evidence.items():
+            if state not in self.state_index[var]:
+                return f"state: {state} is an unknown for variable: {var}. It must be one of {self.states[var]}"
+        return None
+
+    def encode_evidence(self, evidences):
+        """
+        Split a batch of evidence dicts into:
+        - fixed: {variable: (n,) state index} for variables observed in every
+          row; potentials are sliced on these, which removes their axes
+        - observed: {variable: (n, card) 0/1 indicator} for variables observed
+          in only some rows; these are multiplied in
+        """
+        n = len(evidences)
+        positions = {}
+        for row, evidence in enumerate(evidences):
+            for var, state in evidence.items():
+                try:
+                    pos = self.state_index[var][state]
+                except KeyError:
+                    raise KeyError(self.unknown_state(evidence))
+                positions.setdefault(var, {})[row] = pos
+
+        fixed, observed = {}, {}
+        for var, rows in positions.items():
+            if len(rows) == n:
+                fixed[var] = np.fromiter((rows[r] for r in range(n)), dtype=np.intp, count=n)
+            else:
+                ind = np.ones((n, len(self.states[var])))
+                for row, pos in rows.items():
+                    ind[row] = 0.0
+                    ind[row, pos] = 1.0
+                observed[var] = ind
+        return n, fixed, observed
+
+    def _potential(self, idx, fixed):
+        """Clique potential sliced on the fixed variables, with its einsum labels."""
+        clique = self.cliques[idx]
+        fixed_axes = [i for i, v in enumerate(clique) if v in fixed]
+        if not fixed_axes:
+            return self.potentials[idx], self._sub(clique)
+
+        free_axes = [i for i, v in enumerate(clique) if v not in fixed]
+        pot = self.potentials[idx].transpose(fixed_axes + free_axes)
+        pot = pot[tuple(fixed[clique[i]] for i in fixed_axes)]
+        return pot, [self.batch, *self._sub(clique[i] for i in free_axes)]
+
+    def _message_labels(self, sender, receiver, fixed):
+        return [self.batch, *self._sub(v for v in self.separators[(sender, receiver)] if v not in fixed)]
+
+    def _operands(self, idx, evidence, messages, exclude=None):
+        n, fixed, observed = evidence
+        pot, labels = self._potential(idx, fixed)
+        operands = [pot, labels, np.ones(n), [self.batch]]
+        for var in self.cliques[idx]:
+            if var in observed and self.var_clique[var] == idx:
+                operands += [observed[var], [self.batch, self.labels[var]]]
+        for k in self.tree.neighbors(idx):
+            if k != exclude:
+                operands += [messages[(k, idx)], self._message_labels(k, idx, fixed)]
+        return operands
+
+    @staticmethod
+    def _normalize(values):
+        total = values.sum(axis=tuple(range(1, values.ndim)), keepdims=True)
+        return values / np.where(total == 0, 1.0, total)
+
+    def propagate(self, evidence):
+        """Run both passes; returns the messages keyed by (sender, receiver)."""
+        messages = {}
+        for sender, receiver in self.schedule:
+            operands = self._operands(sender, evidence, messages, exclude=receiver)
+            out = self._message_labels(sender, receiver, evidence[1])
+            messages[(sender, receiver)] = self._normalize(np.einsum(*operands, out))
+        return messages
+
+    def marginal(self, var, evidence, messages):
+        """(n, card) posterior of `var`."""
+        operands = self._operands(self.var_clique[var], evidence, messages)
+        belief = np.einsum(*operands, [self.batch, self.labels[var]])
+        total = belief.sum(axis=1, keepdims=True)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return belief / total
+
+    def query_arrays(self, variables, evidences):
+        """{variable: (len(evidences), card) array} of posteriors, one row per evidence set."""
+        for evidence in evidences:
+            common = set(variables) & set(evidence)
+            if common:
+                raise ValueError(
+                    f"Can't have the same variables in both `variables` and `evidence`. Found in both: {common}"
+                )
+
+        encoded = self.encode_evidence(evidences)
+        messages = self.propagate(encoded)
+        return {var: self.marginal(var, encoded, messages) for var in variables}
+
+    def query_states(self, variables, fixed):
+        """
+        query_arrays for a batch in which every row observes the same
+        variables, given directly as {variable: (n,) state index array}.
+        """
+        n = len(next(iter(fixed.values()))) if fixed else 1
+        encoded = (n, fixed, {})
+        messages = self.propagate(encoded)
+        return {var: self.marginal(var, encoded, messages) for var in variables}
+
+    def query(self, variables, evidence):
+        """Return {variable: {state: prob}} for every variable, given evidence."""
+        arrays = self.query_arrays(variables, [evidence])
+        return {
+            var: {
+                state: float(prob)
+                for state, prob in zip(self.states[var], arrays[var][0])
+            }
+            for var in variables
+        }
@@ -0,0 +1,75 @@
+import hashlib
+import io
+import threading
+
+MEDIA_TYPES = {
+    "png": "image/png",
+    "svg": "image/svg+xml",
+}
+
+# rcParams are process-wide; renders hold this while they change them
+_rc_lock = threading.Lock()
+
+
+def render_graph(edges, fmt="png"):
+    """
+    Draw the network with matplotlib's object-oriented API.
+
+    A standalone Figure is used instead of pyplot so that concurrent renders
+    do not share global figure state.
+    """
+    import matplotlib
+    import networkx as nx
+    from matplotlib.figure import Figure
+
+    G = nx.DiGraph()
+    G.add_edges_from(edges)
+
+    fig = Figure(figsize=(16, 12))
+    ax = fig.add_subplot()
+
+    # Use spring_layout if pygraphviz is unavailable
+    try:
+        pos = nx.nx_agraph.graphviz_layout(G, prog="dot")
+    except Exception:
+        pos = nx.spring_layout(G, seed=42, k=1.5)
+
+    nx.draw(
+        G,
+        pos,
+        ax=ax,
+        with_labels=True,
+        node_size=2500,
+        node_color="lightblue",
+        font_size=10,
+        arrowsize=20
+    )
+
+    # The same graph must give the same bytes in every process, as the
+    # ETag is their hash: SVG otherwise embeds the date and random ids
+    options = {"metadata": {"Date": None}} if fmt == "svg" else {}
+    buf = io.BytesIO()
+    with _rc_lock, matplotlib.rc_context({"svg.hashsalt": "endo-insight"}):
+        fig.savefig(buf, format=fmt, bbox_inches="tight", **options)
+    return buf.getvalue()
+
+
+class GraphImageCache:
+    """Rendered graph images, one per format, built on first request."""
+
+    def __init__(self, edges):
+        self.edges = list(edges)
+        self._images = {}
+        self._lock = threading.Lock()
+
+    def get(self, fmt="png"):
+        """Return (bytes, etag) for the requested format."""
+        image = self._images.get(fmt)
+        if image is None:
+            with self._lock:
+                image = self._images.get(fmt)
+                if image is None:
+                    body = render_graph(self.edges, fmt)
+                    image = (body, '"' + hashlib.sha1(body).hexdigest() + '"')
+                    self._images[fmt] = image
+        return image
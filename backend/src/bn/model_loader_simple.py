@@ -1,14 +1,38 @@
+import os
 import pickle
 from pgmpy.inference import VariableElimination
 from pathlib import Path
+from src.bn.cache import InferenceCache
+from src.bn.clique_tree import CompiledJunctionTree
+from src.bn.graph_image import GraphImageCache
+from src.bn.posterior_table import PosteriorTables, TABLE_DIR, network_digest
+
+ENGINES = ("variable_elimination", "junction_tree")
 
 class ModelArtifacts:
-    def __init__(self, path="model"):
-        path = Path(path)
-        with open(path / "bayesian_network.pkl", "rb") as f:
-            self.model = pickle.load(f)
+    def __init__(self, path="model", cache_size=4096, engine=None):
+        self.path = Path(path)
+        self.engine = engine or os.environ.get("BN_INFERENCE_ENGINE", "variable_elimination")
+        if self.engine not in ENGINES:
+            raise ValueError(f"Unknown inference engine '{self.engine}', expected one of {ENGINES}")
+
+        self.cache = InferenceCache(cache_size)
+        self.load()
+
+    def load(self):
+        """(Re)load the network pickle and its posterior tables. Cached query results are dropped."""
+        with open(self.path / "bayesian_network.pkl", "rb") as f:
+            data = f.read()
+        self.model = pickle.loads(data)
+        self.posterior_tables = PosteriorTables.load(self.path / TABLE_DIR, network_digest(data))
 
-        self.inference = VariableElimination(self.model)
+        # The compiled junction tree answers multi-target and batched queries
+        # whichever engine serves single-target ones
+        self.junction_tree = CompiledJunctionTree(self.model)
+        if self.engine == "variable_elimination":
+            self.inference = VariableElimination(self.model)
+        self.graph_images = GraphImageCache(self.model.edges())
+        self.cache.clear()
 
     @property
     def nodes(self):
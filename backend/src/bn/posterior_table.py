@@ -0,0 +1,279 @@
+"""
+Precomputed posteriors of a target over every combination of states of a
+fixed set of evidence variables, so the most common queries are a table
+lookup instead of an inference.
+
+    python -m src.bn.posterior_table                      # the fields of /bayesian/predict
+    python -m src.bn.posterior_table --fields edad imc FIGO2023
+    python -m src.bn.posterior_table --query-log queries.ndjson --top 3
+
+A table for evidence variables (v1, ..., vk) with cardinalities
+(c1, ..., ck) is a (c1 * ... * ck, card(target)) array whose row for
+states (s1, ..., sk) is the mixed-radix number s1 * c2 * ... * ck + ... + sk.
+Each table is written to model/posterior_tables/ as <name>.npy plus a
+<name>.json header; index.json lists the tables and the network they were
+compiled from. Tables are memory-mapped read-only, so every process
+serving the model shares one copy through the page cache.
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import sys
+from collections import Counter
+from pathlib import Path
+
+import numpy as np
+
+TABLE_DIR = "posterior_tables"
+INDEX = "index.json"
+
+# Evidence combinations propagated per batch while compiling
+COMPILE_CHUNK = 16384
+
+# Largest table compiled by default (rows); the fields of /bayesian/predict
+# give 5.4M rows, about 86 MB for a binary target
+MAX_ENTRIES = 20_000_000
+
+logger = logging.getLogger(__name__)
+
+
+def network_digest(data):
+    """Identifies the network a table was compiled from."""
+    return hashlib.sha1(data).hexdigest()
+
+
+class PosteriorTable:
+    """P(target | fields) for every combination of states of `fields`."""
+
+    def __init__(self, target, fields, states, values):
+        self.target = target
+        self.fields = tuple(fields)
+        self.states = states
+        self.target_states = list(states[target])
+        self.values = values
+
+        radices = [len(states[f]) for f in self.fields]
+        self.strides = [int(np.prod(radices[i + 1:], dtype=np.int64)) for i in range(len(radices))]
+        self._index = [{s: i for i, s in enumerate(states[f])} for f in self.fields]
+
+    def __len__(self):
+        return len(self.values)
+
+    def lookup(self, evidence):
+        """
+        {state: prob} of the target given evidence on exactly `fields`, or
+        None for a state the network does not know or evidence with zero
+        probability, which are left to the inference engine.
+        """
+        row = 0
+        for field, index, stride in zip(self.fields, self._index, self.strides):
+            state = index.get(evidence[field])
+            if state is None:
+                return None
+            row += state * stride
+
+        probs = self.values[row]
+        if np.isnan(probs[0]):
+            return None
+        return dict(zip(self.target_states, probs.tolist()))
+
+    @classmethod
+    def compile(cls, junction_tree, target, fields, out=None):
+        """
+        Propagate every combination of states of `fields` through the
+        compiled junction tree. `out` is an optional preallocated array,
+        e.g. a memory map being written to disk.
+        """
+        fields = list(fields)
+        if target in fields:
+            raise ValueError(f"Target '{target}' can't also be an evidence field")
+
+        radices = [len(junction_tree.states[f]) for f in fields]
+        total = int(np.prod(radices, dtype=np.int64))
+        if out is None:
+            out = np.empty((total, len(junction_tree.states[target])))
+
+        for start in range(0, total, COMPILE_CHUNK):
+            rows = np.arange(start, min(start + COMPILE_CHUNK, total))
+            fixed = dict(zip(fields, np.unravel_index(rows, radices))) if fields else {}
+            out[rows[0]:rows[-1] + 1] = junction_tree.query_states([target], fixed)[target]
+
+        return cls(target, fields, junction_tree.states, out)
+
+    def header(self):
+        return {
+            "target": self.target,
+            "fields": list(self.fields),
+            "states": {v: list(self.states[v]) for v in (*self.fields, self.target)},
+            "entries": len(self),
+        }
+
+    def save(self, directory, name):
+        """Write <name>.npy and <name>.json; each file is replaced atomically."""
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+
+        tmp = directory / f"{name}.npy.tmp"
+        with open(tmp, "wb") as f:
+            np.save(f, np.ascontiguousarray(self.values))
+        os.replace(tmp, directory / f"{name}.npy")
+
+        tmp = directory / f"{name}.json.tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.header(), f, indent=2)
+        os.replace(tmp, directory / f"{name}.json")
+
+    @classmethod
+    def load(cls, directory, name):
+        directory = Path(directory)
+        with open(directory / f"{name}.json") as f:
+            header = json.load(f)
+        values = np.load(directory / f"{name}.npy", mmap_mode="r")
+        if values.shape != (header["entries"], len(header["states"][header["target"]])):
+            raise ValueError(f"Posterior table '{name}' does not match its header")
+        return cls(header["target"], header["fields"], header["states"], values)
+
+
+class PosteriorTables:
+    """The compiled tables of one network, keyed by target and evidence variables."""
+
+    def __init__(self, tables=()):
+        self.tables = {(t.target, frozenset(t.fields)): t for t in tables}
+        self.hits = 0
+
+    def __len__(self):
+        return len(self.tables)
+
+    def lookup(self, target, evidence):
+        """{state: prob} if a table covers exactly this target and evidence, else None."""
+        if not self.tables:
+            return None
+        table = self.tables.get((target, frozenset(evidence)))
+        if table is None:
+            return None
+        probs = table.lookup(evidence)
+        if probs is not None:
+            self.hits += 1
+        return probs
+
+    @classmethod
+    def load(cls, directory, digest):
+        """
+        Tables listed in directory/index.json. Tables compiled from a
+        different network than `digest` are stale and skipped.
+        """
+        path = Path(directory) / INDEX
+        if not path.exists():
+            return cls()
+
+        with open(path) as f:
+            index = json.load(f)
+        if index["network"] != digest:
+            logger.warning("Ignoring posterior tables in %s: compiled from another network", directory)
+            return cls()
+        return cls(PosteriorTable.load(directory, name) for name in index["tables"])
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "tables": [
+                {"target": t.target, "fields": list(t.fields), "entries": len(t)}
+                for t in self.tables.values()
+            ],
+        }
+
+
+def fields_from_log(path, nodes, target, top):
+    """
+    The `top` most frequent evidence variable sets in an NDJSON query log.
+    Each line is a request body: {"evidence": {...}} as sent to
+    /bayesian/predict-flexible, or a patient as sent to /bayesian/predict.
+    """
+    from app.schemas.patient_simple import PatientInput
+    from src.bn.preprocess_simple import preprocess_patient
+
+    counts = Counter()
+    with open(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            body = json.loads(line)
+            if "evidence" in body:
+                evidence = body["evidence"] or {}
+            else:
+                evidence = PatientInput.model_validate(body).model_dump()
+            keys = frozenset(
+                k for k in preprocess_patient(evidence) if k in nodes and k != target
+            )
+            counts[keys] += 1
+
+    return [sorted(keys) for keys, _ in counts.most_common(top)]
+
+
+def main():
+    from src.bn.model_loader_simple import ModelArtifacts
+    from src.bn.predict_simple import TARGET_VAR
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model-dir", default="model")
+    parser.add_argument("--target", default=TARGET_VAR)
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--fields", nargs="*", help="Evidence variables of one table")
+    source.add_argument("--query-log", help="NDJSON request bodies; compile the most frequent evidence sets")
+    parser.add_argument("--top", type=int, default=1, help="Tables to compile from --query-log")
+    parser.add_argument("--max-entries", type=int, default=MAX_ENTRIES, help="Skip tables with more rows than this")
+    args = parser.parse_args()
+
+    artifacts = ModelArtifacts(args.model_dir, engine="junction_tree")
+    jt = artifacts.junction_tree
+    nodes = set(artifacts.nodes)
+
+    if args.query_log:
+        field_sets = fields_from_log(args.query_log, nodes, args.target, args.top)
+    elif args.fields is not None:
+        field_sets = [args.fields]
+    else:
+        from app.schemas.patient_simple import PatientInput
+        field_sets = [[f for f in PatientInput.model_fields if f in nodes]]
+
+    if args.target not in nodes:
+        sys.exit(f"Target '{args.target}' is not a node of the network")
+
+    directory = Path(args.model_dir) / TABLE_DIR
+    names = []
+    for fields in field_sets:
+        unknown = [f for f in fields if f not in nodes]
+        if unknown:
+            sys.exit(f"Fields {unknown} are not nodes of the network")
+
+        entries = int(np.prod([len(jt.states[f]) for f in fields], dtype=np.int64))
+        if entries > args.max_entries:
+            print(f"skipping {fields}: {entries} rows exceeds --max-entries", file=sys.stderr)
+            continue
+
+        name = f"{args.target}-{hashlib.sha1(' '.join(sorted(fields)).encode()).hexdigest()[:10]}"
+        PosteriorTable.compile(jt, args.target, fields).save(directory, name)
+        names.append(name)
+        print(f"{name}: {args.target} over {len(fields)} fields, {entries} rows", flush=True)
+
+    # Written last, so a reload never sees a table before it is complete.
+    # Tables compiled earlier for the same network stay listed.
+    with open(Path(args.model_dir) / "bayesian_network.pkl", "rb") as f:
+        digest = network_digest(f.read())
+    if (directory / INDEX).exists():
+        with open(directory / INDEX) as f:
+            index = json.load(f)
+        if index["network"] == digest:
+            names = list(dict.fromkeys(index["tables"] + names))
+
+    tmp = directory / f"{INDEX}.tmp"
+    directory.mkdir(parents=True, exist_ok=True)
+    with open(tmp, "w") as f:
+        json.dump({"network": digest, "tables": names}, f, indent=2)
+    os.replace(tmp, directory / INDEX)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,72 @@
+import numpy as np
 from src.bn.preprocess_simple import preprocess_patient
+from src.monitoring.metrics import BN_QUERIES, BN_QUERY_SOURCES, Stopwatch, stages
 
 TARGET_VAR = "recidiva"
+BATCH_CHUNK = 1024
+
+_QUERY_STAGES = stages(
+    "bayesian", "query_marginals",
+    "table", "cache", "variable_elimination", "junction_tree",
+)
+_PATIENT_STAGES = stages("bayesian", "predict_patient", "preprocess", "query", "result")
+_BATCH_STAGES = stages("bayesian", "predict_batch", "prepare", "inference", "results")
+_FLEXIBLE_STAGES = stages("bayesian", "predict_flexible", "preprocess", "query")
+_VOI_STAGES = stages("bayesian", "value_of_information", "current", "outcomes", "ranking")
+_SOURCES = {s: BN_QUERY_SOURCES.labels(s) for s in ("table", "cache", "inference", "duplicate")}
+
+
+def query_marginals(targets, evidence, artifacts):
+    """
+    Marginal distribution {state: prob} of each target given evidence.
+    Single-target queries covered by a precomputed posterior table are
+    looked up; other results are memoized on artifacts.cache.
+    """
+    clock = Stopwatch()
+    BN_QUERIES.labels(len(evidence), len(set(targets))).inc()
+
+    if len(set(targets)) == 1:
+        probs = artifacts.posterior_tables.lookup(targets[0], evidence)
+        clock.lap(_QUERY_STAGES["table"])
+        if probs is not None:
+            _SOURCES["table"].inc()
+            return {targets[0]: probs}
+
+    key = artifacts.cache.make_key(targets, evidence)
+    results = artifacts.cache.get(key)
+    clock.lap(_QUERY_STAGES["cache"])
+    if results is not None:
+        _SOURCES["cache"].inc()
+        return results
+
+    _SOURCES["inference"].inc()
+    targets = list(dict.fromkeys(targets))
+    if artifacts.engine == "junction_tree" or len(targets) > 1:
+        # One propagation through the junction tree answers every target at once
+        results = artifacts.junction_tree.query(targets, evidence)
+        clock.lap(_QUERY_STAGES["junction_tree"])
+    else:
+        query = artifacts.inference.query(
+            variables=targets,
+            evidence=evidence,
+            show_progress=False
+        )
+
+        # Convert to dictionary: {state_name: probability}
+        results = {
+            targets[0]: {
+                state: float(prob)
+                for state, prob in zip(query.state_names[targets[0]], query.values)
+            }
+        }
+        clock.lap(_QUERY_STAGES["variable_elimination"])
+
+    artifacts.cache.put(key, results)
+    return results
+
 
 def predict_patient(patient_data: dict, artifacts):
+    clock = Stopwatch()
     evidence = preprocess_patient(patient_data)
 
     # Remove variables not in the model
@@ -10,33 +74,112 @@ def predict_patient(patient_data: dict, artifacts):
         k: v for k, v in evidence.items()
         if k in artifacts.model.nodes()
     }
+    clock.lap(_PATIENT_STAGES["preprocess"])
 
-    query = artifacts.inference.query(
-        variables=[TARGET_VAR],
-        evidence=evidence,
-        show_progress=False
-    )
-
-    probs = {
-        state: float(prob)
-        for state, prob in zip(
-            query.state_names[TARGET_VAR],
-            query.values
-        )
-    }
+    probs = query_marginals([TARGET_VAR], evidence, artifacts)[TARGET_VAR]
+    clock.lap(_PATIENT_STAGES["query"])
 
     most_likely = max(probs, key=probs.get)
 
-    return {
+    result = {
         "target": TARGET_VAR,
         "probabilities": probs,
         "most_likely": most_likely
     }
+    clock.lap(_PATIENT_STAGES["result"])
+    return result
+
+
+def predict_batch(patient_list, artifacts):
+    """
+    Posterior of TARGET_VAR for many patients.
+
+    Patients covered by a posterior table are looked up; of the rest, those
+    with the same evidence are computed once, and evidence sets not in the
+    cache are propagated together through the compiled junction tree.
+    Patients with a state the network does not know get an "error" instead
+    of probabilities, so one bad row does not fail the batch.
+    """
+    clock = Stopwatch()
+    cache = artifacts.cache
+    tables = artifacts.posterior_tables
+    jt = artifacts.junction_tree
+    nodes = artifacts.model.nodes()
+
+    keys = []
+    resolved = {}
+    pending = {}
+    # Tallied locally and recorded once per batch
+    evidence_sizes = {}
+    sources = dict.fromkeys(_SOURCES, 0)
+    for patient_data in patient_list:
+        evidence = {
+            k: v for k, v in preprocess_patient(patient_data).items()
+            if k in nodes
+        }
+        evidence_sizes[len(evidence)] = evidence_sizes.get(len(evidence), 0) + 1
+        key = cache.make_key([TARGET_VAR], evidence)
+        keys.append(key)
+        if key in resolved or key in pending:
+            sources["duplicate"] += 1
+            continue
+        error = jt.unknown_state(evidence)
+        if error is not None:
+            resolved[key] = error
+            continue
+        probs = tables.lookup(TARGET_VAR, evidence)
+        if probs is not None:
+            resolved[key] = probs
+            sources["table"] += 1
+            continue
+        cached = cache.get(key)
+        if cached is not None:
+            resolved[key] = cached[TARGET_VAR]
+            sources["cache"] += 1
+        else:
+            pending[key] = evidence
+            sources["inference"] += 1
+    clock.lap(_BATCH_STAGES["prepare"])
+
+    states = jt.states[TARGET_VAR]
+    pending = list(pending.items())
+    for start in range(0, len(pending), BATCH_CHUNK):
+        chunk = pending[start:start + BATCH_CHUNK]
+        posterior = jt.query_arrays(
+            [TARGET_VAR], [evidence for _, evidence in chunk]
+        )[TARGET_VAR]
+        for (key, _), row in zip(chunk, posterior):
+            probs = {state: float(p) for state, p in zip(states, row)}
+            resolved[key] = probs
+            cache.put(key, {TARGET_VAR: probs})
+    clock.lap(_BATCH_STAGES["inference"])
+
+    results = []
+    for key in keys:
+        probs = resolved[key]
+        if isinstance(probs, str):
+            results.append({"target": TARGET_VAR, "error": probs})
+            continue
+        results.append({
+            "target": TARGET_VAR,
+            "probabilities": probs,
+            "most_likely": max(probs, key=probs.get),
+        })
+    clock.lap(_BATCH_STAGES["results"])
+
+    for size, count in evidence_sizes.items():
+        BN_QUERIES.labels(size, 1).inc(count)
+    for source, count in sources.items():
+        if count:
+            _SOURCES[source].inc(count)
+
+    return results
 
 
 def predict_flexible(targets, evidence, artifacts):
     from src.bn.preprocess_simple import preprocess_patient
 
+    clock = Stopwatch()
     # Preprocess evidence
     if evidence is None:
         evidence = {}
@@ -45,20 +188,107 @@ def predict_flexible(targets, evidence, artifacts):
     # Remove unknown nodes
     evidence_proc = {k: v for k, v in evidence_proc.items() if k in artifacts.model.nodes()}
 
-    results = {}
     for target in targets:
         if target not in artifacts.model.nodes():
             raise ValueError(f"Target '{target}' is not a valid node in the network")
-        
-        query = artifacts.inference.query(
-            variables=[target],
-            evidence=evidence_proc,
-            show_progress=False
-        )
+    clock.lap(_FLEXIBLE_STAGES["preprocess"])
 
-        # Convert to dictionary: {state_name: probability}
-        probs = {state: float(prob) for state, prob in zip(query.state_names[target], query.values)}
-        results[target] = probs
+    marginals = query_marginals(targets, evidence_proc, artifacts)
+    results = {target: marginals[target] for target in targets}
+    clock.lap(_FLEXIBLE_STAGES["query"])
 
     return {"results": results}
 
+
+def _entropy(probs):
+    """Entropy in bits along the last axis; 0 * log 0 counts as 0."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        terms = np.where(probs > 0, -probs * np.log2(probs), 0.0)
+    return terms.sum(axis=-1)
+
+
+def value_of_information(target, evidence, artifacts, candidates=None, rank_by="entropy"):
+    """
+    Rank unobserved nodes by how much observing them would be expected to
+    change the posterior of `target`, given evidence:
+    - expected_entropy_reduction: H(T | e) - sum_x P(x | e) H(T | e, x),
+      the mutual information in bits
+    - expected_posterior_shift: sum_x P(x | e) TV(P(T | e, x), P(T | e)),
+      with TV the total variation distance
+
+    One query gives P(T | e) and every candidate's P(X | e). A second,
+    batched query propagates one row per (candidate, state) together: the
+    shared evidence is sliced into the clique potentials once and each row
+    only adds its own observation.
+    """
+    jt = artifacts.junction_tree
+    nodes = artifacts.model.nodes()
+
+    evidence = {
+        k: v for k, v in preprocess_patient(evidence or {}).items()
+        if k in nodes
+    }
+
+    if target not in nodes:
+        raise ValueError(f"Target '{target}' is not a valid node in the network")
+    if target in evidence:
+        raise ValueError(f"Target '{target}' is already observed in the evidence")
+
+    if candidates is None:
+        candidates = [n for n in artifacts.nodes if n != target and n not in evidence]
+    else:
+        candidates = list(dict.fromkeys(candidates))
+        for var in candidates:
+            if var not in nodes:
+                raise ValueError(f"Candidate '{var}' is not a valid node in the network")
+            if var == target or var in evidence:
+                raise ValueError(f"Candidate '{var}' is the target or already observed")
+
+    clock = Stopwatch()
+    current = jt.query_arrays([target, *candidates], [evidence])
+    prior = current[target][0]
+    prior_entropy = float(_entropy(prior))
+    clock.lap(_VOI_STAGES["current"])
+
+    rows = [{**evidence, var: state} for var in candidates for state in jt.states[var]]
+    posteriors = jt.query_arrays([target], rows)[target] if rows else None
+    clock.lap(_VOI_STAGES["outcomes"])
+
+    target_states = jt.states[target]
+    ranking = []
+    start = 0
+    for var in candidates:
+        states = jt.states[var]
+        weights = current[var][0]
+        post = posteriors[start:start + len(states)]
+        start += len(states)
+
+        # States impossible under the evidence have no posterior
+        possible = weights > 0
+        post = np.where(possible[:, np.newaxis], post, 0.0)
+        expected_entropy = float(weights @ _entropy(post))
+        shift = float(weights @ (0.5 * np.abs(post - prior).sum(axis=1)))
+
+        ranking.append({
+            "variable": var,
+            "expected_entropy_reduction": max(prior_entropy - expected_entropy, 0.0),
+            "expected_posterior_shift": shift,
+            "outcomes": {
+                state: {
+                    "probability": float(w),
+                    "posterior": dict(zip(target_states, p.tolist())) if ok else None,
+                }
+                for state, w, p, ok in zip(states, weights, post, possible)
+            },
+        })
+
+    key = "expected_entropy_reduction" if rank_by == "entropy" else "expected_posterior_shift"
+    ranking.sort(key=lambda r: r[key], reverse=True)
+    clock.lap(_VOI_STAGES["ranking"])
+
+    return {
+        "target": target,
+        "posterior": dict(zip(target_states, prior.tolist())),
+        "entropy": prior_entropy,
+        "ranking": ranking,
+    }
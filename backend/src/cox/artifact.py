@@ -0,0 +1,168 @@
+"""
+Single-file binary Cox artifact, read without lifelines.
+
+    python -m src.cox.artifact model/    # convert cox_model.pkl and its JSON files
+
+Layout: an 8-byte magic, a little-endian uint32 format version and uint32
+header length, a JSON header, then float64 arrays each starting at a
+multiple of ALIGN bytes. The header holds the small metadata (column map,
+medians, thresholds, feature importance) and the offset, dtype and shape of
+every array, so reading maps the file and returns views into it without
+copying.
+
+The header also records a sha1 of the pickle and JSON files the artifact
+was built next to; if one of them has since been replaced, the artifact is
+stale and the loader falls back to those files.
+"""
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+from pathlib import Path
+
+import numpy as np
+
+ARTIFACT_FILE = "cox_model.bin"
+SOURCE_FILES = (
+    "cox_model.pkl", "preprocess.json", "risk_thresholds.json",
+    "feature_importance.json", "km_curves.json",
+)
+
+MAGIC = b"ENDOCOX\0"
+FORMAT_VERSION = 1
+ALIGN = 64
+_PREAMBLE = struct.Struct("<8sII")
+
+
+def source_digests(directory):
+    """sha1 of each SOURCE_FILES file present in directory."""
+    digests = {}
+    for name in SOURCE_FILES:
+        path = Path(directory) / name
+        if path.exists():
+            digests[name] = hashlib.sha1(path.read_bytes()).hexdigest()
+    return digests
+
+
+def write_artifact(path, arrays, meta):
+    """Write {name: array} and a JSON-serialisable meta dict to path, atomically."""
+    arrays = {name: np.ascontiguousarray(a, dtype=np.float64) for name, a in arrays.items()}
+
+    # Offsets depend on the header length, which depends on the offsets;
+    # lay out relative offsets first and shift them once the header fits
+    layout, size = {}, 0
+    for name, a in arrays.items():
+        layout[name] = {"dtype": a.dtype.str, "shape": list(a.shape), "offset": size}
+        size += -(-a.nbytes // ALIGN) * ALIGN
+
+    start = ALIGN
+    while True:
+        header = json.dumps({
+            "format_version": FORMAT_VERSION,
+            "arrays": {n: {**l, "offset": l["offset"] + start} for n, l in layout.items()},
+            "meta": meta,
+        }).encode()
+        needed = -(-(_PREAMBLE.size + len(header)) // ALIGN) * ALIGN
+        if needed <= start:
+            break
+        start = needed
+
+    path = Path(path)
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "wb") as f:
+        f.write(_PREAMBLE.pack(MAGIC, FORMAT_VERSION, len(header)))
+        f.write(header)
+        for name, a in arrays.items():
+            f.seek(start + layout[name]["offset"])
+            f.write(a.tobytes())
+        f.truncate(start + size)
+    os.replace(tmp, path)
+
+
+def read_artifact(path):
+    """
+    (arrays, meta). Arrays are read-only views of a memory map of the
+    file, so processes loading the same artifact share its pages.
+    """
+    with open(path, "rb") as f:
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    magic, version, header_len = _PREAMBLE.unpack_from(buffer)
+    if magic != MAGIC:
+        raise ValueError(f"{path} is not a Cox artifact")
+    if version != FORMAT_VERSION:
+        raise ValueError(f"{path} has format version {version}, expected {FORMAT_VERSION}")
+
+    header = json.loads(buffer[_PREAMBLE.size:_PREAMBLE.size + header_len])
+    arrays = {
+        name: np.frombuffer(
+            buffer, dtype=spec["dtype"], count=int(np.prod(spec["shape"])), offset=spec["offset"]
+        ).reshape(spec["shape"])
+        for name, spec in header["arrays"].items()
+    }
+    return arrays, header["meta"]
+
+
+def export_artifact(directory, model, preprocess, thresholds, feature_importance, km):
+    """
+    Write directory/ARTIFACT_FILE for a fitted CoxPHFitter.
+
+    `preprocess`, `thresholds` and `feature_importance` are the contents of
+    the matching JSON files; `km` maps each risk group to
+    (n_patients, times, survival) arrays.
+    """
+    columns = preprocess["train_columns"]
+    baseline = model.baseline_cumulative_hazard_
+
+    arrays = {
+        "coefs": model.params_.loc[columns].to_numpy(),
+        "norm_mean": model._norm_mean.loc[columns].to_numpy(),
+        "baseline_times": baseline.index.to_numpy(),
+        "baseline_cumhaz": baseline.to_numpy()[:, 0],
+    }
+    km_groups = {}
+    for group, (n_patients, times, survival) in km.items():
+        arrays[f"km_times/{group}"] = times
+        arrays[f"km_survival/{group}"] = survival
+        km_groups[group] = int(n_patients)
+
+    write_artifact(Path(directory) / ARTIFACT_FILE, arrays, {
+        "preprocess": preprocess,
+        "thresholds": thresholds,
+        "feature_importance": feature_importance,
+        "km_groups": km_groups,
+        "sources": source_digests(directory),
+    })
+
+
+def main():
+    """Convert the pickle and JSON artifacts in a model directory."""
+    import pickle
+
+    directory = Path(sys.argv[1] if len(sys.argv) > 1 else "model")
+    with open(directory / "cox_model.pkl", "rb") as f:
+        model = pickle.load(f)
+
+    def load(name):
+        with open(directory / name) as f:
+            return json.load(f)
+
+    km = {
+        group: (
+            curves["n_patients"],
+            np.array([p["time_days"] for p in curves["curve"]], dtype=float),
+            np.array([p["survival"] for p in curves["curve"]], dtype=float),
+        )
+        for group, curves in load("km_curves.json").items()
+    }
+    export_artifact(
+        directory, model, load("preprocess.json"), load("risk_thresholds.json"),
+        load("feature_importance.json"), km,
+    )
+    print(f"wrote {directory / ARTIFACT_FILE}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+import numpy as np
+
+DFS_TIMES = [365, 3*365, 5*365]
+
+
+class CompiledCoxModel:
+    """
+    Arrays needed to score a fitted CoxPHFitter, without lifelines.
+
+    partial hazard = exp((x - mean) . beta)
+    survival(t)    = exp(-H0(t) * partial hazard)
+
+    H0 is linearly interpolated between baseline event times, as lifelines
+    does in predict_survival_function.
+    """
+
+    def __init__(self, columns, coefs, norm_mean, baseline_times, baseline_cumhaz):
+        self.columns = list(columns)
+        self.coefs = np.ascontiguousarray(coefs, dtype=np.float64)
+        self.norm_mean = np.ascontiguousarray(norm_mean, dtype=np.float64)
+        self.baseline_times = np.ascontiguousarray(baseline_times, dtype=np.float64)
+        self.baseline_cumhaz = np.ascontiguousarray(baseline_cumhaz, dtype=np.float64)
+
+        # (x - mean) . beta == x . beta - offset
+        self.offset = float(self.norm_mean @ self.coefs)
+        self.dfs_cumhaz = self.cumulative_hazard_at(DFS_TIMES)
+
+        # Baseline survival S0(t) on a daily grid up to the last event time;
+        # a patient's curve on this grid is S0 ** partial hazard
+        self.grid_times = np.arange(
+            0, np.ceil(self.baseline_times[-1]) + 1, dtype=np.float64
+        )
+        self.baseline_survival = np.exp(-self.cumulative_hazard_at(self.grid_times))
+
+    @classmethod
+    def from_lifelines(cls, model, columns):
+        baseline = model.baseline_cumulative_hazard_
+        return cls(
+            columns=columns,
+            coefs=model.params_.loc[columns].values,
+            norm_mean=model._norm_mean.loc[columns].values,
+            baseline_times=baseline.index.values,
+            baseline_cumhaz=baseline.values[:, 0],
+        )
+
+    def cumulative_hazard_at(self, times):
+        return np.interp(times, self.baseline_times, self.baseline_cumhaz)
+
+    def log_partial_hazard(self, X):
+        return X @ self.coefs - self.offset
+
+    def partial_hazard(self, X):
+        return np.exp(self.log_partial_hazard(X))
+
+    def survival_at(self, scores, times):
+        """Survival at arbitrary times; one row per score."""
+        return np.exp(-np.multiply.outer(scores, self.cumulative_hazard_at(times)))
+
+    def survival_curve(self, scores, step=1):
+        """Survival on the precomputed daily grid, every `step` days."""
+        return np.power(self.baseline_survival[::step], np.expand_dims(scores, -1))
+
+    def dfs_probabilities(self, scores):
+        """Survival at DFS_TIMES; one row per score."""
+        return np.exp(-np.multiply.outer(scores, self.dfs_cumhaz))
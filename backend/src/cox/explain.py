@@ -0,0 +1,57 @@
+import numpy as np
+
+
+class Explainer:
+    """
+    Per-feature contributions to a patient's log partial hazard, relative
+    to the training-median patient:
+
+        contribution_j = (x_j - median_j) * beta_j
+
+    They sum to log(risk_score / baseline_risk_score). Columns without a
+    median (one-hot levels) have a baseline of 0.
+    """
+
+    def __init__(self, compiled, medians):
+        self.columns = compiled.columns
+        self.coefs = compiled.coefs
+        self.baseline = np.array([float(medians.get(c, 0.0)) for c in self.columns])
+        self.baseline_risk_score = float(compiled.partial_hazard(self.baseline))
+
+    def contributions(self, X):
+        """(n, features) contribution matrix for an (n, features) design matrix."""
+        return (X - self.baseline) * self.coefs
+
+    @staticmethod
+    def ranked(contrib, k=None):
+        """
+        Column indices per row, largest |contribution| first and ties in
+        column order; only the top k when given, selected in linear time
+        with a partition so the full row is never sorted.
+        """
+        magnitude = np.abs(contrib)
+        n, m = contrib.shape
+        if k is None or k >= m:
+            idx = np.broadcast_to(np.arange(m), contrib.shape)
+        else:
+            # Everything above the k-th largest magnitude, then ties at it in
+            # column order, so the top k is a prefix of the full ranking
+            kth = -np.partition(-magnitude, k - 1, axis=1)[:, k - 1:k]
+            above = magnitude > kth
+            tied = magnitude == kth
+            room = k - above.sum(axis=1, keepdims=True)
+            selected = above | (tied & (np.cumsum(tied, axis=1) <= room))
+            idx = np.nonzero(selected)[1].reshape(n, k)
+        keys = np.take_along_axis(magnitude, idx, axis=1)
+        order = np.lexsort((idx, -keys))
+        return np.take_along_axis(idx, order, axis=1)
+
+    def explain(self, X, k=None):
+        """One {feature: contribution} dict per row, largest first."""
+        contrib = self.contributions(X)
+        idx = self.ranked(contrib, k)
+        values = np.take_along_axis(contrib, idx, axis=1).tolist()
+        return [
+            {self.columns[j]: v for j, v in zip(row_idx, row_values)}
+            for row_idx, row_values in zip(idx.tolist(), values)
+        ]
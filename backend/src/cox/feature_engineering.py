@@ -1,5 +1,31 @@
+import numpy as np
 import pandas as pd
 
+NODAL_COLS = [
+    "n_GC_Afect",
+    "n_gangP_afec",
+    "n_ganPaor_InfrM_afec",
+    "n_ganPaor_Sup_afec",
+]
+
+GENETIC_COLS = [f"estudio_genetico_r0{i}" for i in range(1, 7)]
+
+# Derived feature -> (rule, source columns). Same definitions as
+# build_summarized_features, which training uses
+DERIVED_FEATURES = {
+    "nodal_positive": ("any_positive", NODAL_COLS),
+    "genetic_test_done": ("any_present", GENETIC_COLS),
+    "genetic_abnormal": ("any_equal_one", GENETIC_COLS),
+}
+
+# A rule is "any source value in [low, high]"; None/NaN never is
+RULES = {
+    "any_positive": (np.nextafter(0.0, 1.0), np.inf),
+    "any_present": (-np.inf, np.inf),
+    "any_equal_one": (1.0, 1.0),
+}
+
+
 def build_summarized_features(df: pd.DataFrame) -> pd.DataFrame:
     df = df.copy()
 
@@ -30,3 +56,58 @@ def build_summarized_features(df: pd.DataFrame) -> pd.DataFrame:
     df["genetic_abnormal"] = (df[gen_cols] == 1).any(axis=1).astype(int)
 
     return df
+
+
+class DerivedFeatures:
+    """
+    Derived-feature definitions compiled to array operations.
+
+    Every (feature, source column) pair becomes one column of a gathered
+    block with its [low, high] bounds, so all features are derived with a
+    single gather, one bounds check and a grouped any (reduceat), whether
+    for one row or a million. Single dicts evaluate the same bounds in
+    plain Python, where NumPy call overhead would dominate.
+    """
+
+    def __init__(self, definitions=DERIVED_FEATURES):
+        self.names = list(definitions)
+        self.rules = [(RULES[rule], cols) for rule, cols in definitions.values()]
+        self.sources = list(dict.fromkeys(col for _, cols in self.rules for col in cols))
+
+        index = {col: i for i, col in enumerate(self.sources)}
+        gather, low, high, starts = [], [], [], []
+        for (lo, hi), cols in self.rules:
+            starts.append(len(gather))
+            gather += [index[col] for col in cols]
+            low += [lo] * len(cols)
+            high += [hi] * len(cols)
+        self.gather = np.array(gather)
+        self.low = np.array(low)
+        self.high = np.array(high)
+        self.starts = np.array(starts)
+
+    def compute(self, block):
+        """(n, len(names)) array of 0/1 from an (n, len(sources)) block, NaN where missing."""
+        values = block[:, self.gather]
+        hit = (values >= self.low) & (values <= self.high)
+        return np.logical_or.reduceat(hit, self.starts, axis=1).astype(float)
+
+    def derive(self, patient_dict):
+        """Copy of the dict with the derived features set."""
+        derived = {
+            name: int(any(
+                v is not None and lo <= v <= hi
+                for v in (patient_dict.get(col) for col in cols)
+            ))
+            for name, ((lo, hi), cols) in zip(self.names, self.rules)
+        }
+        return {**patient_dict, **derived}
+
+    def derive_frame(self, df):
+        """Copy of the frame with the derived features set."""
+        block = df.reindex(columns=self.sources).to_numpy(dtype=float)
+        values = self.compute(block).astype(int)
+        return df.assign(**{name: values[:, j] for j, name in enumerate(self.names)})
+
+
+derived_features = DerivedFeatures()
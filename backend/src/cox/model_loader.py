@@ -1,10 +1,67 @@
-import json, pickle
+import json, logging, pickle
 from pathlib import Path
+from .artifact import ARTIFACT_FILE, read_artifact, source_digests
+from .compiled import CompiledCoxModel
+from .explain import Explainer
+from .preprocessing import FeatureEncoder
+
+logger = logging.getLogger(__name__)
 
 class ModelArtifacts:
+    """
+    Loads cox_model.bin when it is present and up to date, without
+    lifelines; otherwise the lifelines pickle and JSON files. `model` is the
+    lifelines fitter, and only set when loaded from the pickle.
+    """
+
     def __init__(self, path="model"):
         path = Path(path)
 
+        if not self._load_binary(path):
+            self._load_pickle(path)
+
+        self.final_features = self.preprocess["final_features"]
+        self.medians = self.preprocess["num_medians"]
+        self.train_columns = self.preprocess["train_columns"]
+
+        self.encoder = FeatureEncoder.from_artifacts(self)
+        self.explainer = Explainer(self.compiled, self.medians)
+
+    def _load_binary(self, path):
+        if not (path / ARTIFACT_FILE).exists():
+            return False
+
+        arrays, meta = read_artifact(path / ARTIFACT_FILE)
+        current = source_digests(path)
+        stale = [f for f, digest in meta["sources"].items() if current.get(f, digest) != digest]
+        if stale:
+            logger.warning("Ignoring %s: %s changed since it was built", ARTIFACT_FILE, ", ".join(stale))
+            return False
+
+        self.model = None
+        self.preprocess = meta["preprocess"]
+        self.thresholds = meta["thresholds"]
+        self.feature_importance = meta["feature_importance"]
+        self.km_curves = {
+            group: {
+                "n_patients": n_patients,
+                "curve": [
+                    {"time_days": int(t), "survival": s}
+                    for t, s in zip(arrays[f"km_times/{group}"].tolist(), arrays[f"km_survival/{group}"].tolist())
+                ],
+            }
+            for group, n_patients in meta["km_groups"].items()
+        }
+        self.compiled = CompiledCoxModel(
+            self.preprocess["train_columns"],
+            arrays["coefs"],
+            arrays["norm_mean"],
+            arrays["baseline_times"],
+            arrays["baseline_cumhaz"],
+        )
+        return True
+
+    def _load_pickle(self, path):
         with open(path / "cox_model.pkl", "rb") as f:
             self.model = pickle.load(f)
 
@@ -20,7 +77,7 @@ class ModelArtifacts:
         with open(path / "km_curves.json") as f:
             self.km_curves = json.load(f)
 
-        self.final_features = self.preprocess["final_features"]
-        self.medians = self.preprocess["num_medians"]
-        self.train_columns = self.preprocess["train_columns"]
-
+        # Plain float64 arrays used for scoring at request time
+        self.compiled = CompiledCoxModel.from_lifelines(
+            self.model, self.preprocess["train_columns"]
+        )
@@ -1,28 +1,152 @@
-def predict_patient(patient_dict, artifacts):
-    from .preprocessing import preprocess_one
-    from .risk import risk_group_from_score
+import numpy as np
+from src.monitoring.metrics import Stopwatch, stages
 
-    X = preprocess_one(patient_dict, artifacts)
+_PATIENT_STAGES = stages("cox", "predict_patient", "encode", "score", "risk_group", "top_contributors", "explain")
+_CURVE_STAGES = stages("cox", "predict_survival_curve", "encode", "curve")
+_BATCH_STAGES = stages("cox", "predict_batch", "preprocess", "score", "results", "explain")
+_SWEEP_STAGES = stages("cox", "predict_sweep", "encode", "score", "results")
 
-    score = float(artifacts.model.predict_partial_hazard(X).iloc[0])
 
-    surv = artifacts.model.predict_survival_function(
-        X, times=[365, 3*365, 5*365]
-    )
+def _add_explanations(results, X, artifacts, explain_top):
+    explainer = artifacts.explainer
+    for result, contributions in zip(results, explainer.explain(X, explain_top)):
+        result["contributions"] = contributions
+        result["baseline_risk_score"] = explainer.baseline_risk_score
+
+
+def predict_patient(patient_dict, artifacts, explain=False, explain_top=None):
+    from .risk import risk_group_from_score
+
+    clock = Stopwatch()
+    cox = artifacts.compiled
+    x = artifacts.encoder.encode(patient_dict)
+    clock.lap(_PATIENT_STAGES["encode"])
+
+    score = float(cox.partial_hazard(x))
+    surv = cox.dfs_probabilities(score)
+    clock.lap(_PATIENT_STAGES["score"])
 
     result = {
         "risk_score": score,
         "risk_group": risk_group_from_score(score, artifacts.thresholds),
-        "dfs_prob_1y": float(surv.iloc[0, 0]),
-        "dfs_prob_3y": float(surv.iloc[1, 0]),
-        "dfs_prob_5y": float(surv.iloc[2, 0]),
+        "dfs_prob_1y": float(surv[0]),
+        "dfs_prob_3y": float(surv[1]),
+        "dfs_prob_5y": float(surv[2]),
     }
+    clock.lap(_PATIENT_STAGES["risk_group"])
 
     # Explainability: beta * x
-    coefs = artifacts.model.params_
-    contrib = (X.iloc[0] * coefs).sort_values(
-        key=lambda v: v.abs(), ascending=False
+    contrib = x * cox.coefs
+    order = np.argsort(-np.abs(contrib), kind="stable")[:5]
+    result["top_contributors"] = {
+        cox.columns[j]: float(contrib[j]) for j in order
+    }
+    clock.lap(_PATIENT_STAGES["top_contributors"])
+
+    if explain:
+        _add_explanations([result], x[np.newaxis], artifacts, explain_top)
+        clock.lap(_PATIENT_STAGES["explain"])
+
+    return result
+
+
+def predict_survival_curve(patient_dict, artifacts, horizons=None, step_days=1):
+    clock = Stopwatch()
+    cox = artifacts.compiled
+    x = artifacts.encoder.encode(patient_dict)
+    clock.lap(_CURVE_STAGES["encode"])
+    score = float(cox.partial_hazard(x))
+
+    if horizons is None:
+        times = cox.grid_times[::step_days]
+        surv = cox.survival_curve(score, step=step_days)
+    else:
+        times = np.asarray(horizons, dtype=float)
+        surv = cox.survival_at(score, times)
+
+    result = {
+        "risk_score": score,
+        "times": times.tolist(),
+        "survival": surv.tolist(),
+    }
+    clock.lap(_CURVE_STAGES["curve"])
+    return result
+
+
+def predict_batch(patient_dicts, artifacts, explain=False, explain_top=None):
+    from .preprocessing import preprocess_many
+    from .risk import risk_group_from_score
+
+    if not patient_dicts:
+        return []
+
+    clock = Stopwatch()
+    cox = artifacts.compiled
+    X = preprocess_many(patient_dicts, artifacts).to_numpy(dtype=float)
+    clock.lap(_BATCH_STAGES["preprocess"])
+
+    # One matrix product for the whole batch
+    scores = cox.partial_hazard(X)
+    surv = cox.dfs_probabilities(scores)
+    clock.lap(_BATCH_STAGES["score"])
+
+    # Explainability: beta * x, top 5 by absolute value
+    contrib = X * cox.coefs
+    order = np.argsort(-np.abs(contrib), axis=1, kind="stable")[:, :5]
+
+    results = []
+    for i, score in enumerate(scores):
+        score = float(score)
+        results.append({
+            "risk_score": score,
+            "risk_group": risk_group_from_score(score, artifacts.thresholds),
+            "dfs_prob_1y": float(surv[i, 0]),
+            "dfs_prob_3y": float(surv[i, 1]),
+            "dfs_prob_5y": float(surv[i, 2]),
+            "top_contributors": {
+                cox.columns[j]: float(contrib[i, j]) for j in order[i]
+            },
+        })
+    clock.lap(_BATCH_STAGES["results"])
+
+    if explain:
+        _add_explanations(results, X, artifacts, explain_top)
+        clock.lap(_BATCH_STAGES["explain"])
+
+    return results
+
+
+def predict_sweep(patient_dict, axes, artifacts):
+    """
+    Score a one- or two-way grid of what-if variants of one patient.
+
+    `axes` is a list of (feature, values). The grid is encoded as one
+    matrix and scored in a single call; every output is an array shaped
+    like the grid (len(values_1),) or (len(values_1), len(values_2)).
+    """
+    from .risk import risk_groups_from_scores
+
+    clock = Stopwatch()
+    cox = artifacts.compiled
+    grids = np.meshgrid(*[np.asarray(values, dtype=float) for _, values in axes], indexing="ij")
+    shape = grids[0].shape
+
+    X = artifacts.encoder.encode_variants(
+        patient_dict, {feature: grid.ravel() for (feature, _), grid in zip(axes, grids)}
     )
-    result["top_contributors"] = contrib.head(5).to_dict()
+    clock.lap(_SWEEP_STAGES["encode"])
+    scores = cox.partial_hazard(X)
+    surv = cox.dfs_probabilities(scores)
+    clock.lap(_SWEEP_STAGES["score"])
 
+    result = {
+        "features": [feature for feature, _ in axes],
+        "values": [list(map(float, values)) for _, values in axes],
+        "risk_score": scores.reshape(shape).tolist(),
+        "risk_group": risk_groups_from_scores(scores, artifacts.thresholds).reshape(shape).tolist(),
+        "dfs_prob_1y": surv[:, 0].reshape(shape).tolist(),
+        "dfs_prob_3y": surv[:, 1].reshape(shape).tolist(),
+        "dfs_prob_5y": surv[:, 2].reshape(shape).tolist(),
+    }
+    clock.lap(_SWEEP_STAGES["results"])
     return result
@@ -1,7 +1,9 @@
+import numpy as np
 import pandas as pd
+from .feature_engineering import derived_features
 
 def preprocess_one(patient_dict, artifacts):
-    df = pd.DataFrame([patient_dict])
+    df = pd.DataFrame([derived_features.derive(patient_dict)])
 
     # Keep only final features
     df = df[[c for c in artifacts.final_features if c in df.columns]]
@@ -18,3 +20,136 @@ def preprocess_one(patient_dict, artifacts):
     df = df.reindex(columns=artifacts.train_columns, fill_value=0)
 
     return df
+
+
+def preprocess_many(patient_dicts, artifacts):
+    return preprocess_frame(pd.DataFrame.from_records(patient_dicts), artifacts)
+
+
+def preprocess_frame(df, artifacts):
+    df = derived_features.derive_frame(df)
+
+    # Keep only final features
+    df = df[[c for c in artifacts.final_features if c in df.columns]].copy()
+
+    # Median imputation
+    for col, med in artifacts.medians.items():
+        if col in df.columns:
+            df[col] = df[col].astype(float).fillna(med)
+
+    # One-hot encode without drop_first: which level is "first" depends on the
+    # batch, so let the reindex below drop the reference levels instead
+    df = pd.get_dummies(df)
+
+    # Align to training columns
+    df = df.reindex(columns=artifacts.train_columns, fill_value=0)
+
+    return df
+
+
+class FeatureEncoder:
+    """
+    preprocess_one without pandas, compiled once from preprocess.json.
+
+    encode() derives the engineered features, then writes the patient dict
+    straight into a float64 row laid out as train_columns, with the same
+    rules as the pandas path:
+    - a feature with a median takes float(value), or the median when the
+      value is None/NaN, or 0 when the key is absent from the dict
+    - a string value of a feature without a median sets its one-hot column
+      (train column "<feature>_<value>") if that level was seen in training
+    - every other column is 0
+
+    For features without a median this follows preprocess_many: on a single
+    row, get_dummies(drop_first=True) drops the only level present. The
+    current model has no such features.
+    """
+
+    def __init__(self, final_features, medians, train_columns):
+        self.columns = list(train_columns)
+        index = {c: j for j, c in enumerate(self.columns)}
+
+        self.numeric = [
+            (f, index[f], float(medians[f]))
+            for f in final_features if f in medians and f in index
+        ]
+        self.onehot = {
+            f: {c[len(f) + 1:]: j for c, j in index.items() if c.startswith(f + "_")}
+            for f in final_features if f not in medians
+        }
+        self.passthrough = [
+            (f, index[f]) for f in final_features if f not in medians and f in index
+        ]
+        self.derived = [
+            (k, index[name]) for k, name in enumerate(derived_features.names) if name in index
+        ]
+
+        # Numeric patient fields that can change the encoded row
+        self.inputs = (
+            {f for f, _, _ in self.numeric} | {f for f, _ in self.passthrough}
+            | set(derived_features.sources)
+        ) - set(derived_features.names)
+
+    @classmethod
+    def from_artifacts(cls, artifacts):
+        return cls(artifacts.final_features, artifacts.medians, artifacts.train_columns)
+
+    def encode(self, patient_dict, out=None):
+        """Encoded row; written into `out` (a 1-D float64 array) when given."""
+        row = np.zeros(len(self.columns)) if out is None else out
+        if out is not None:
+            row.fill(0.0)
+        patient_dict = derived_features.derive(patient_dict)
+
+        for feature, j, median in self.numeric:
+            if feature in patient_dict:
+                value = patient_dict[feature]
+                row[j] = median if value is None or value != value else float(value)
+
+        for feature, levels in self.onehot.items():
+            value = patient_dict.get(feature)
+            if isinstance(value, str):
+                j = levels.get(value)
+                if j is not None:
+                    row[j] = 1.0
+
+        for feature, j in self.passthrough:
+            value = patient_dict.get(feature)
+            if value is not None and not isinstance(value, str):
+                row[j] = float(value)
+
+        return row
+
+    def encode_variants(self, patient_dict, overrides):
+        """
+        (n, columns) matrix whose row i encodes the patient with each feature
+        in `overrides` ({feature: (n,) numeric values}) set to its i-th
+        value; the same rows encode() gives one variant at a time.
+        """
+        unknown = set(overrides) - self.inputs
+        if unknown:
+            raise ValueError(f"Not numeric model inputs: {sorted(unknown)}")
+
+        values = {f: np.asarray(v, dtype=float) for f, v in overrides.items()}
+        n = len(next(iter(values.values())))
+        X = np.tile(self.encode(patient_dict), (n, 1))
+
+        for feature, j, median in self.numeric:
+            if feature in values:
+                X[:, j] = np.where(np.isnan(values[feature]), median, values[feature])
+        for feature, j in self.passthrough:
+            if feature in values:
+                X[:, j] = values[feature]
+
+        sources = derived_features.sources
+        if any(f in values for f in sources):
+            block = np.tile(np.array([[patient_dict.get(c) for c in sources]], dtype=float), (n, 1))
+            for i, col in enumerate(sources):
+                if col in values:
+                    block[:, i] = values[col]
+            derived = derived_features.compute(block)
+            for k, j in self.derived:
+                X[:, j] = derived[:, k]
+
+        return X
+
@@ -1,6 +1,16 @@
+import numpy as np
+
+
 def risk_group_from_score(score, thresholds):
     if score <= thresholds["q1"]:
         return "Low"
     elif score <= thresholds["q2"]:
         return "Medium"
-    return "High"
\ No newline at end of file
+    return "High"
+
+
+def risk_groups_from_scores(scores, thresholds):
+    return np.where(
+        scores <= thresholds["q1"], "Low",
+        np.where(scores <= thresholds["q2"], "Medium", "High"),
+    )
@@ -0,0 +1,242 @@
+"""
+In-process latency histograms and counters, exposed in the Prometheus
+text format.
+
+Recording is a bisect and a few increments under a per-series lock, about
+a microsecond, so it stays on in production. Series are created on first
+use; label values must come from small fixed sets (stage names, route
+templates, node counts), never from request data.
+
+Inference that runs in an InferencePool process records into that
+process's metrics; the pool ships them back with each result (drain and
+merge), so /metrics in the API process covers it too.
+"""
+import threading
+from bisect import bisect_left
+from time import perf_counter
+
+# Seconds; from a microsecond (Cox stages) to seconds (large batches)
+LATENCY_BUCKETS = (
+    1e-6, 2.5e-6, 5e-6, 1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4,
+    1e-3, 2.5e-3, 5e-3, 1e-2, 2.5e-2, 5e-2, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class _Series:
+    __slots__ = ("family", "labels", "lock")
+
+    def __init__(self, family, labels):
+        self.family = family
+        self.labels = labels
+        self.lock = threading.Lock()
+
+
+class CounterSeries(_Series):
+    __slots__ = ("value",)
+
+    def __init__(self, family, labels):
+        super().__init__(family, labels)
+        self.value = 0.0
+
+    def inc(self, amount=1):
+        with self.lock:
+            self.value += amount
+        self.family.registry.dirty.add(self)
+
+    def take(self):
+        with self.lock:
+            value, self.value = self.value, 0.0
+        return value
+
+    def add(self, value):
+        with self.lock:
+            self.value += value
+
+
+class HistogramSeries(_Series):
+    __slots__ = ("counts", "sum")
+
+    def __init__(self, family, labels):
+        super().__init__(family, labels)
+        # One count per bucket plus one above the last bound (+Inf)
+        self.counts = [0] * (len(family.buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        i = bisect_left(self.family.buckets, value)
+        with self.lock:
+            self.counts[i] += 1
+            self.sum += value
+        self.family.registry.dirty.add(self)
+
+    def take(self):
+        with self.lock:
+            counts, total = self.counts, self.sum
+            self.counts = [0] * len(counts)
+            self.sum = 0.0
+        return counts, total
+
+    def add(self, value):
+        counts, total = value
+        with self.lock:
+            for i, c in enumerate(counts):
+                self.counts[i] += c
+            self.sum += total
+
+
+class _Family:
+    series_class = None
+    kind = None
+
+    def __init__(self, registry, name, help, labelnames):
+        self.registry = registry
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        # Series by label text, and by the values callers pass (11 and "11" are one series)
+        self._series = {}
+        self._lookup = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values):
+        """The series for these label values, in labelnames order."""
+        series = self._lookup.get(values)
+        if series is None:
+            labels = tuple(map(str, values))
+            with self._lock:
+                series = self._series.setdefault(labels, self.series_class(self, labels))
+                self._lookup[values] = series
+        return series
+
+    def _label_text(self, labels, extra=()):
+        pairs = [*zip(self.labelnames, labels), *extra]
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for series in list(self._series.values()):
+            lines.extend(self._render_series(series))
+        return lines
+
+
+class Counter(_Family):
+    series_class = CounterSeries
+    kind = "counter"
+
+    def _render_series(self, series):
+        yield f"{self.name}{self._label_text(series.labels)} {series.value!r}"
+
+
+class Histogram(_Family):
+    series_class = HistogramSeries
+    kind = "histogram"
+
+    def __init__(self, registry, name, help, labelnames, buckets=LATENCY_BUCKETS):
+        super().__init__(registry, name, help, labelnames)
+        self.buckets = tuple(buckets)
+
+    def _render_series(self, series):
+        with series.lock:
+            counts, total = list(series.counts), series.sum
+        cumulative = 0
+        for bound, count in zip((*map(repr, self.buckets), "+Inf"), counts):
+            cumulative += count
+            yield f"{self.name}_bucket{self._label_text(series.labels, [('le', bound)])} {cumulative}"
+        yield f"{self.name}_sum{self._label_text(series.labels)} {total!r}"
+        yield f"{self.name}_count{self._label_text(series.labels)} {cumulative}"
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.families = {}
+        # Series recorded since the last drain()
+        self.dirty = set()
+
+    def _register(self, family):
+        if family.name in self.families:
+            raise ValueError(f"Metric '{family.name}' is already registered")
+        self.families[family.name] = family
+        return family
+
+    def counter(self, name, help, labelnames=()):
+        return self._register(Counter(self, name, help, labelnames))
+
+    def histogram(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self._register(Histogram(self, name, help, labelnames, buckets))
+
+    def drain(self):
+        """Take what was recorded since the last drain, as a picklable delta for merge()."""
+        if not self.dirty:
+            return None
+        delta = []
+        while self.dirty:
+            series = self.dirty.pop()
+            delta.append((series.family.name, series.labels, series.take()))
+        return delta
+
+    def merge(self, delta):
+        """Add a delta from another process's drain()."""
+        for name, labels, value in delta or ():
+            self.families[name].labels(*labels).add(value)
+
+    def render(self):
+        lines = []
+        for family in self.families.values():
+            lines.extend(family.render())
+        return "\n".join(lines) + "\n"
+
+
+class Stopwatch:
+    """
+    Times consecutive stages of one call: each lap(series) observes the
+    time since the previous lap (or since the stopwatch started).
+    """
+    __slots__ = ("last",)
+
+    def __init__(self):
+        self.last = perf_counter()
+
+    def lap(self, series):
+        now = perf_counter()
+        series.observe(now - self.last)
+        self.last = now
+
+
+metrics = MetricsRegistry()
+
+REQUEST_SECONDS = metrics.histogram(
+    "endo_request_duration_seconds",
+    "Time from receiving a request until its response is sent",
+    ("method", "route", "status"),
+)
+REQUEST_PHASE_SECONDS = metrics.histogram(
+    "endo_request_phase_seconds",
+    "Request time by phase: validate (body read, parsing, validation), endpoint, serialize",
+    ("method", "route", "phase"),
+)
+STAGE_SECONDS = metrics.histogram(
+    "endo_inference_stage_seconds",
+    "Time spent in each stage of the prediction functions",
+    ("model", "function", "stage"),
+)
+BN_QUERIES = metrics.counter(
+    "endo_bn_queries_total",
+    "Bayesian-network queries by number of evidence variables and of targets",
+    ("evidence", "targets"),
+)
+BN_QUERY_SOURCES = metrics.counter(
+    "endo_bn_query_results_total",
+    "Bayesian-network query results by where they came from",
+    ("source",),
+)
+
+
+def stages(model, function, *names):
+    """{stage: series} for the stages of one prediction function."""
+    return {name: STAGE_SECONDS.labels(model, function, name) for name in names}
@@ -1,9 +1,10 @@
-import pickle, json
+import pickle, json, hashlib, os, warnings
 import pandas as pd
 import numpy as np
 
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from sklearn.model_selection import train_test_split
+from sklearn.model_selection import train_test_split, KFold
 from lifelines import KaplanMeierFitter, CoxPHFitter
 from lifelines.utils import concordance_index
 
@@ -60,12 +61,160 @@ def penalty_value_check(df, features, seed = 42):
 
     return pen_results
 
-from pathlib import Path
-import json, pickle
-import numpy as np
-import pandas as pd
-from sklearn.model_selection import train_test_split
-from lifelines import CoxPHFitter, KaplanMeierFitter
+
+# Encoded design matrices by content of the input, kept between runs
+_design_cache = {}
+
+
+def design_matrix(df, features, cache_dir=None):
+    """
+    (X, T, E, columns): the preprocessing of c_index_check (median
+    imputation and one-hot encoding over the whole frame) as float arrays.
+
+    Results are cached in memory, and under cache_dir if given, keyed by
+    a hash of the input columns, so repeated runs on the same data skip it.
+    """
+    model_df = df[features + ["time_days", "event"]]
+    digest = hashlib.sha1(pd.util.hash_pandas_object(model_df, index=False).values)
+    digest.update(json.dumps([features, model_df.dtypes.astype(str).tolist()]).encode())
+    key = digest.hexdigest()[:16]
+
+    if key in _design_cache:
+        return _design_cache[key]
+
+    path = Path(cache_dir) / f"design-{key}.npz" if cache_dir else None
+    if path is not None and path.exists():
+        data = np.load(path, allow_pickle=False)
+        design = data["X"], data["T"], data["E"], data["columns"].tolist()
+    else:
+        model_df = model_df.copy()
+        num_cols = model_df.select_dtypes(include=[np.number]).columns
+        model_df[num_cols] = model_df[num_cols].fillna(model_df[num_cols].median())
+        model_df = pd.get_dummies(model_df, drop_first=True)
+
+        columns = [c for c in model_df.columns if c not in ["time_days", "event"]]
+        design = (
+            model_df[columns].to_numpy(dtype=float),
+            model_df["time_days"].to_numpy(dtype=float),
+            model_df["event"].to_numpy(dtype=float),
+            columns,
+        )
+        if path is not None:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            np.savez(path, X=design[0], T=design[1], E=design[2], columns=np.array(columns))
+
+    _design_cache[key] = design
+    return design
+
+
+def validation_splits(n, seeds, folds=None, test_size=0.2):
+    """
+    (seed, fold, train_idx, test_idx) for every seed: the train_test_split
+    holdout of c_index_check when folds is None, else a shuffled K-fold.
+    """
+    index = np.arange(n)
+    for seed in seeds:
+        if folds is None:
+            train, test = train_test_split(index, test_size=test_size, random_state=seed)
+            yield seed, 0, train, test
+        else:
+            kfold = KFold(n_splits=folds, shuffle=True, random_state=seed)
+            for fold, (train, test) in enumerate(kfold.split(index)):
+                yield seed, fold, train, test
+
+
+_design = None
+
+
+def _init_validation_worker(X, T, E, columns):
+    # The design matrix is sent once per worker, not once per task
+    global _design
+    _design = X, T, E, columns
+
+
+def _fit_split(seed, fold, train, test, penalizers):
+    """
+    C-index on one split for every penalizer. Penalizers are fitted in
+    order, each starting from the previous coefficients.
+    """
+    X, T, E, columns = _design
+    train_df = pd.DataFrame(X[train], columns=columns)
+    train_df["time_days"] = T[train]
+    train_df["event"] = E[train]
+
+    rows = []
+    beta = None
+    for p in penalizers:
+        row = {
+            "seed": seed, "fold": fold, "penalizer": p,
+            "n_train": len(train), "n_test": len(test), "events_test": int(E[test].sum()),
+        }
+        try:
+            cph = CoxPHFitter(penalizer=p)
+            cph.fit(train_df, duration_col="time_days", event_col="event", initial_point=beta)
+            beta = cph.params_.to_numpy()
+
+            # Partial hazards are monotone in X @ beta, which is all the C-index needs
+            row["c_index"] = concordance_index(T[test], -(X[test] @ beta), E[test])
+            row["error"] = None
+        except Exception as e:
+            beta = None
+            row["c_index"] = np.nan
+            row["error"] = f"{type(e).__name__}: {e}"
+        rows.append(row)
+
+    return rows
+
+
+def run_validation(
+    df,
+    features,
+    seeds=range(20),
+    penalizers=(0.01, 0.1, 0.5),
+    folds=None,
+    test_size=0.2,
+    workers=None,
+    cache_dir=None
+):
+    """
+    C-index of CoxPHFitter over every seed x penalizer x fold.
+
+    Preprocesses once (see design_matrix), then fits the splits on a
+    process pool of `workers` processes (default: one per CPU, 0 fits in
+    this process). With folds=None each seed is one holdout split, as in
+    c_index_check; otherwise each seed is a shuffled K-fold.
+
+    Returns one row per fit: seed, fold, penalizer, n_train, n_test,
+    events_test, c_index and error (fits that failed have a NaN c_index).
+    summarize_validation turns it into C-index distributions per penalizer.
+    """
+    X, T, E, columns = design_matrix(df, features, cache_dir)
+    penalizers = sorted(penalizers)
+    splits = list(validation_splits(len(X), seeds, folds, test_size))
+
+    if workers is None:
+        workers = os.cpu_count()
+
+    if workers == 0:
+        _init_validation_worker(X, T, E, columns)
+        results = [_fit_split(*split, penalizers) for split in splits]
+    else:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_validation_worker,
+            initargs=(X, T, E, columns),
+        ) as executor:
+            futures = [executor.submit(_fit_split, *split, penalizers) for split in splits]
+            results = [f.result() for f in futures]
+
+    return pd.DataFrame([row for rows in results for row in rows])
+
+
+def summarize_validation(results):
+    """C-index distribution per penalizer, from run_validation's results."""
+    summary = results.groupby("penalizer")["c_index"].describe(percentiles=[0.025, 0.5, 0.975])
+    summary["failed"] = results["c_index"].isna().groupby(results["penalizer"]).sum()
+    return summary.rename(columns={"count": "fits"})
 
 
 def save_model(
@@ -73,7 +222,8 @@ def save_model(
     features,
     path="artifacts",
     seed=42,
-    penalizer=0.1
+    penalizer=0.1,
+    exporter=None
 ):
     """
     Trains a Cox model and saves:
@@ -82,7 +232,22 @@ def save_model(
     - risk group thresholds
     - feature importance
     - KM survival curves by risk group
+    - all of the above except the lifelines fitter as cox_model.bin, the
+      single-file artifact the API loads without lifelines
+
+    cox_model.bin is written by `exporter`, src.cox.artifact.export_artifact
+    by default. That needs backend/ on the import path; without it the other
+    files are still saved and the API serves them until the artifact is
+    built with `python -m src.cox.artifact <path>` from backend/.
     """
+    if exporter is None:
+        try:
+            from src.cox.artifact import export_artifact as exporter
+        except ImportError:
+            warnings.warn(
+                "src.cox.artifact is not importable (run from backend/ to "
+                "write cox_model.bin); saving the pickle and JSON files only"
+            )
 
     path = Path(path)
     path.mkdir(exist_ok=True)
@@ -171,15 +336,12 @@ def save_model(
     coef_df["importance"] = coef_df["coef"].abs()
     coef_df = coef_df.sort_values("importance", ascending=False)
 
-    feature_importance = [
-        {
-            "internal_name": row["covariate"],
-            "hazard_ratio": float(row["exp(coef)"]),
-            "coef": float(row["coef"]),
-            "importance": float(row["importance"])
-        }
-        for _, row in coef_df.iterrows()
-    ]
+    feature_importance = pd.DataFrame({
+        "internal_name": coef_df["covariate"],
+        "hazard_ratio": coef_df["exp(coef)"].astype(float),
+        "coef": coef_df["coef"].astype(float),
+        "importance": coef_df["importance"].astype(float)
+    }).to_dict("records")
 
     with open(path / "feature_importance.json", "w") as f:
         json.dump(feature_importance, f, indent=2)
@@ -197,6 +359,7 @@ def save_model(
     )
 
     km_data = {}
+    km_arrays = {}
 
     for g in ["Low", "Medium", "High"]:
         mask = df_km["risk_group"] == g
@@ -207,20 +370,32 @@ def save_model(
             df_km.loc[mask, "event"]
         )
 
-        km_df = kmf.survival_function_.reset_index()
+        times = kmf.survival_function_.index.to_numpy(dtype=float)
+        survival = kmf.survival_function_.iloc[:, 0].to_numpy(dtype=float)
+        km_arrays[g] = (int(mask.sum()), times, survival)
 
         km_data[g] = {
             "n_patients": int(mask.sum()),
-            "curve": [
-                {
-                    "time_days": int(row["timeline"]),
-                    "survival": float(row[kmf.survival_function_.columns[0]])
-                }
-                for _, row in km_df.iterrows()
-            ]
+            "curve": pd.DataFrame({
+                "time_days": times.astype(int),
+                "survival": survival
+            }).to_dict("records")
         }
 
     with open(path / "km_curves.json", "w") as f:
         json.dump(km_data, f, indent=2)
 
+    # -------------------------
+    # 11) Binary artifact (written last: it records the files above)
+    # -------------------------
+    if exporter is not None:
+        exporter(
+            path,
+            cph,
+            preprocess_meta,
+            {"q1": float(q1), "q2": float(q2)},
+            feature_importance,
+            km_arrays
+        )
+
     return cph
@@ -0,0 +1,39 @@
+import pickle
+from pathlib import Path
+
+import pytest
+
+MODEL_DIR = Path(__file__).resolve().parent.parent / "model"
+
+
+@pytest.fixture(scope="session")
+def cox_fitter():
+    """The lifelines CoxPHFitter the serving artifacts were built from."""
+    with open(MODEL_DIR / "cox_model.pkl", "rb") as f:
+        return pickle.load(f)
+
+
+@pytest.fixture(scope="session")
+def cox_artifacts():
+    from src.cox.model_loader import ModelArtifacts
+    return ModelArtifacts(MODEL_DIR)
+
+
+@pytest.fixture(scope="session")
+def bn_artifacts():
+    from src.bn.model_loader_simple import ModelArtifacts
+    return ModelArtifacts(MODEL_DIR)
+
+
+@pytest.fixture(scope="session")
+def bn_patient(bn_artifacts):
+    """A patient whose every field has a state the network knows."""
+    from app.schemas.patient_simple import PatientInput
+
+    states = bn_artifacts.junction_tree.state_index
+    patient = {}
+    for field, props in PatientInput.model_json_schema()["properties"].items():
+        known = [v for v in props["extra"]["allowed_values"] if v in states.get(field, ())]
+        if known:
+            patient[field] = known[0]
+    return patient
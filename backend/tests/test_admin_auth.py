@@ -0,0 +1,47 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.apis import admin
+from app.profiling import ProfilingMiddleware
+
+
+def make_client(token):
+    app = FastAPI()
+    app.include_router(admin.router)
+
+    @app.get("/ping")
+    def ping():
+        return "pong"
+
+    app.add_middleware(ProfilingMiddleware, admin_token=token, sample_rate=0)
+    return TestClient(app)
+
+
+@pytest.mark.parametrize("token", [None, ""])
+def test_admin_is_closed_without_a_token(monkeypatch, token):
+    monkeypatch.setattr(admin, "ADMIN_TOKEN", token)
+    client = make_client(token)
+
+    assert client.get("/admin/models").status_code == 403
+    assert client.post("/admin/models/bayesian/reload").status_code == 403
+    assert client.get("/admin/profiles", headers={"X-Admin-Token": ""}).status_code == 403
+    assert "x-profile-id" not in client.get("/ping", headers={"X-Profile": "1"}).headers
+
+
+def test_admin_requires_the_configured_token(monkeypatch):
+    monkeypatch.setattr(admin, "ADMIN_TOKEN", "s3cret")
+    client = make_client("s3cret")
+
+    assert client.get("/admin/profiles").status_code == 403
+    assert client.get("/admin/profiles", headers={"X-Admin-Token": "wrong"}).status_code == 403
+    assert client.get("/admin/profiles", headers={"X-Admin-Token": "s3cret"}).status_code == 200
+
+
+def test_profile_header_needs_the_token(monkeypatch):
+    monkeypatch.setattr(admin, "ADMIN_TOKEN", "s3cret")
+    client = make_client("s3cret")
+
+    assert "x-profile-id" not in client.get("/ping", headers={"X-Profile": "1"}).headers
+    assert "x-profile-id" not in client.get("/ping", headers={"X-Profile": "1", "X-Admin-Token": "wrong"}).headers
+    assert "x-profile-id" in client.get("/ping", headers={"X-Profile": "1", "X-Admin-Token": "s3cret"}).headers
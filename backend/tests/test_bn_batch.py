@@ -0,0 +1,25 @@
+import pytest
+
+from src.bn.predict_simple import TARGET_VAR, predict_batch, predict_patient
+
+
+def test_batch_matches_single_predictions(bn_artifacts, bn_patient):
+    patients = [bn_patient, {**bn_patient, "edad": None}, bn_patient]
+    batch = predict_batch(patients, bn_artifacts)
+    bn_artifacts.cache.clear()
+    single = predict_patient(bn_patient, bn_artifacts)
+
+    assert batch[0] == batch[2]
+    assert batch[0]["most_likely"] == single["most_likely"]
+    assert batch[0]["probabilities"] == pytest.approx(single["probabilities"], abs=1e-12)
+
+
+def test_unknown_state_fails_only_its_row(bn_artifacts, bn_patient):
+    bad = {**bn_patient, "imc": None}
+    results = predict_batch([bn_patient] * 999 + [bad], bn_artifacts)
+
+    assert len(results) == 1000
+    assert all("probabilities" in r and "error" not in r for r in results[:999])
+    assert results[999]["target"] == TARGET_VAR
+    assert "probabilities" not in results[999]
+    assert "variable: imc" in results[999]["error"]
@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.cox.compiled import DFS_TIMES, CompiledCoxModel
+
+RTOL = 1e-12
+
+
+@pytest.fixture(scope="module")
+def compiled(cox_fitter, cox_artifacts):
+    return CompiledCoxModel.from_lifelines(cox_fitter, cox_artifacts.train_columns)
+
+
+@pytest.fixture(scope="module")
+def rows(cox_fitter, cox_artifacts):
+    """Random design rows within 3 standard deviations of the training means."""
+    columns = cox_artifacts.train_columns
+    mean = cox_fitter._norm_mean.loc[columns].to_numpy()
+    std = cox_fitter._norm_std.loc[columns].to_numpy()
+    rng = np.random.default_rng(0)
+    X = mean + std * rng.uniform(-3, 3, size=(2000, len(columns)))
+    return pd.DataFrame(X, columns=columns)
+
+
+def test_partial_hazard_matches_lifelines(compiled, cox_fitter, rows):
+    expected = cox_fitter.predict_partial_hazard(rows).to_numpy()
+    np.testing.assert_allclose(compiled.partial_hazard(rows.to_numpy()), expected, rtol=RTOL)
+
+
+def test_dfs_probabilities_match_lifelines(compiled, cox_fitter, rows):
+    expected = cox_fitter.predict_survival_function(rows, times=DFS_TIMES).to_numpy().T
+    scores = compiled.partial_hazard(rows.to_numpy())
+    np.testing.assert_allclose(compiled.dfs_probabilities(scores), expected, rtol=RTOL)
+
+
+def test_survival_matches_lifelines_past_last_event(compiled, cox_fitter, rows):
+    last = cox_fitter.baseline_cumulative_hazard_.index.max()
+    times = np.concatenate([np.linspace(0, last, 50), np.linspace(last, 3 * last, 50)])
+    expected = cox_fitter.predict_survival_function(rows, times=times).to_numpy().T
+    scores = compiled.partial_hazard(rows.to_numpy())
+    np.testing.assert_allclose(compiled.survival_at(scores, times), expected, rtol=RTOL)
+
+
+def test_binary_artifact_matches_pickle(compiled, cox_artifacts, rows):
+    """The compiled model loaded from cox_model.bin scores like the one built from the pickle."""
+    X = rows.to_numpy()
+    np.testing.assert_allclose(cox_artifacts.compiled.partial_hazard(X), compiled.partial_hazard(X), rtol=RTOL)
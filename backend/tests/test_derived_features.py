@@ -0,0 +1,81 @@
+import math
+import random
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.cox.feature_engineering import build_summarized_features, derived_features
+from src.cox.predict import predict_patient
+
+SOURCE_VALUES = [None, math.nan, 0, 1, -1, 2]
+
+
+def random_rows(n, seed=0):
+    """Dicts over the source columns with None/NaN/0/1/-1/2 values; some columns absent."""
+    rng = random.Random(seed)
+    rows = []
+    for _ in range(n):
+        absent = set(rng.sample(derived_features.sources, rng.randint(0, 3)))
+        rows.append({c: rng.choice(SOURCE_VALUES) for c in derived_features.sources if c not in absent})
+    return rows
+
+
+def reference(rows):
+    """build_summarized_features on the rows, with absent source columns as missing."""
+    df = pd.DataFrame.from_records(rows).reindex(columns=derived_features.sources)
+    return build_summarized_features(df)[derived_features.names].to_numpy()
+
+
+def test_derive_frame_matches_pandas():
+    rows = random_rows(5000)
+    expected = reference(rows)
+    got = derived_features.derive_frame(pd.DataFrame.from_records(rows))
+    np.testing.assert_array_equal(got[derived_features.names].to_numpy(), expected)
+
+
+@pytest.mark.parametrize("absent", [[], ["n_GC_Afect", "n_gangP_afec"], derived_features.sources])
+def test_derive_frame_with_missing_source_columns(absent):
+    rows = [{c: v for c, v in row.items() if c not in absent} for row in random_rows(500, seed=1)]
+    df = pd.DataFrame.from_records(rows).drop(columns=absent, errors="ignore")
+    got = derived_features.derive_frame(df)
+    np.testing.assert_array_equal(got[derived_features.names].to_numpy(), reference(rows))
+
+
+def test_derive_dict_matches_pandas():
+    rows = random_rows(2000, seed=2)
+    got = [[derived_features.derive(row)[name] for name in derived_features.names] for row in rows]
+    np.testing.assert_array_equal(np.array(got), reference(rows))
+
+
+def test_encoder_derives_like_pandas(cox_artifacts):
+    rows = random_rows(2000, seed=3)
+    columns = [cox_artifacts.train_columns.index(n) for n in derived_features.names if n in cox_artifacts.train_columns]
+    names = [cox_artifacts.train_columns[j] for j in columns]
+    expected = pd.DataFrame(reference(rows), columns=derived_features.names)[names].to_numpy(dtype=float)
+    got = np.array([cox_artifacts.encoder.encode(row)[columns] for row in rows])
+    np.testing.assert_array_equal(got, expected)
+
+
+@pytest.mark.parametrize("inputs, risk_score", [
+    ({}, 1.1815886583928024),
+    ({"estudio_genetico_r01": 0}, 0.7101502193465541),
+    ({"n_gangP_afec": 2}, 3.1757299900883518),
+])
+def test_serving_scores_use_derived_features(cox_artifacts, inputs, risk_score):
+    """
+    Median patient scores, pinned. Before derived features were computed at
+    serving time all three scored the same.
+    """
+    patient = {k: v for k, v in cox_artifacts.medians.items() if k not in derived_features.names}
+    patient.update(inputs)
+
+    # The training path: build_summarized_features, median imputation, alignment
+    df = build_summarized_features(pd.DataFrame([patient]).reindex(columns=[*patient, *derived_features.sources]))
+    df = df[cox_artifacts.final_features].astype(float).fillna(cox_artifacts.medians)
+    X = df.reindex(columns=cox_artifacts.train_columns, fill_value=0).to_numpy()
+    expected = float(cox_artifacts.compiled.partial_hazard(X)[0])
+
+    result = predict_patient(patient, cox_artifacts)
+    assert result["risk_score"] == pytest.approx(expected, rel=1e-12)
+    assert result["risk_score"] == pytest.approx(risk_score, rel=1e-9)
@@ -0,0 +1,35 @@
+import asyncio
+import threading
+
+import anyio
+from starlette.concurrency import run_in_threadpool
+
+from app.executor import InferencePool
+
+
+class Artifacts:
+    version = "test"
+
+
+def blocked(release, artifacts):
+    release.wait(5)
+    return artifacts.version
+
+
+def test_threaded_inference_leaves_the_threadpool_to_sync_endpoints():
+    async def run():
+        # One token: a single inference call on the shared threadpool would starve it
+        anyio.to_thread.current_default_thread_limiter().total_tokens = 1
+        pool = InferencePool(0, threads=2)
+        release = threading.Event()
+
+        calls = [asyncio.create_task(pool.run("test", Artifacts(), blocked, release)) for _ in range(3)]
+        await asyncio.sleep(0.1)
+        try:
+            assert await asyncio.wait_for(run_in_threadpool(lambda: "light"), 2) == "light"
+            assert pool._limiter.borrowed_tokens == 2
+        finally:
+            release.set()
+        return await asyncio.gather(*calls)
+
+    assert asyncio.run(run()) == ["test"] * 3
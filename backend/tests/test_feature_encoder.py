@@ -0,0 +1,46 @@
+import math
+
+import numpy as np
+from hypothesis import given, settings, strategies as st
+
+from app.schemas.patient import PatientInput
+from src.cox.preprocessing import preprocess_one
+
+ABSENT = object()
+
+
+def field_values(props):
+    """A schema field's values: absent, None, NaN or a value in its allowed set or range."""
+    extra = props.get("extra", {})
+    types = [props["type"]] if "type" in props else [a["type"] for a in props["anyOf"]]
+    if "allowed_values" in extra:
+        value = st.sampled_from(extra["allowed_values"])
+    elif "integer" in types:
+        value = st.integers(extra.get("min", 0), extra.get("max", extra.get("min", 0) + 50))
+    else:
+        low = extra.get("min", 0)
+        value = st.floats(low, extra.get("max", low + 50), allow_nan=False)
+    return st.one_of(st.just(ABSENT), st.none(), st.just(math.nan), value)
+
+
+patients = st.fixed_dictionaries({
+    name: field_values(props)
+    for name, props in PatientInput.model_json_schema()["properties"].items()
+}).map(lambda d: {k: v for k, v in d.items() if v is not ABSENT})
+
+
+@settings(max_examples=1000, deadline=None)
+@given(patient=patients)
+def test_encoder_matches_pandas_path(cox_artifacts, patient):
+    expected = preprocess_one(patient, cox_artifacts).to_numpy(dtype=float)[0]
+    np.testing.assert_array_equal(cox_artifacts.encoder.encode(patient), expected)
+
+
+@settings(max_examples=300, deadline=None)
+@given(patient=patients)
+def test_encoder_overwrites_out(cox_artifacts, patient):
+    expected = preprocess_one(patient, cox_artifacts).to_numpy(dtype=float)[0]
+    out = np.full(len(cox_artifacts.train_columns), 7.0)
+    row = cox_artifacts.encoder.encode(patient, out=out)
+    assert row is out
+    np.testing.assert_array_equal(out, expected)
@@ -0,0 +1,12 @@
+import pytest
+
+from src.bn.graph_image import GraphImageCache
+
+
+@pytest.mark.parametrize("fmt", ["png", "svg"])
+def test_etag_is_stable_across_renders(bn_artifacts, fmt):
+    # Each cache renders on its own, as each process and reload does
+    first = GraphImageCache(bn_artifacts.model.edges()).get(fmt)
+    second = GraphImageCache(bn_artifacts.model.edges()).get(fmt)
+    assert first[1] == second[1]
+    assert first[0] == second[0]
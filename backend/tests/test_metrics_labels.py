@@ -0,0 +1,51 @@
+from fastapi import APIRouter, FastAPI
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.testclient import TestClient
+
+from app.monitoring import RequestMetricsMiddleware, TimedRoute
+from src.monitoring.metrics import REQUEST_SECONDS
+
+ORIGIN = "http://localhost:5173"
+
+
+def make_client():
+    app = FastAPI()
+    router = APIRouter(route_class=TimedRoute)
+
+    @router.post("/labels-test/{item}")
+    def post_item(item: str):
+        return item
+
+    app.include_router(router)
+    app.add_middleware(CORSMiddleware, allow_origins=[ORIGIN], allow_methods=["*"])
+    app.add_middleware(RequestMetricsMiddleware)
+    return TestClient(app)
+
+
+def request_paths():
+    return {labels[1] for labels in REQUEST_SECONDS._series}
+
+
+def test_requests_without_a_route_share_one_label():
+    client = make_client()
+    before = request_paths()
+
+    for i in range(20):
+        preflight = client.options(
+            f"/labels-test/{i}",
+            headers={"Origin": ORIGIN, "Access-Control-Request-Method": "POST"},
+        )
+        assert preflight.status_code == 200
+        assert client.get(f"/no-such-path/{i}").status_code == 404
+        assert client.post(f"/labels-test/{i}").status_code == 200
+
+    assert request_paths() - before <= {"unmatched", "/labels-test/{item}"}
+    assert ("OPTIONS", "unmatched", "200") in REQUEST_SECONDS._series
+
+
+def test_docs_keep_their_path():
+    client = make_client()
+
+    assert client.get("/docs").status_code == 200
+    assert client.get("/openapi.json").status_code == 200
+    assert {"/docs", "/openapi.json"} <= request_paths()
@@ -0,0 +1,47 @@
+from fastapi import APIRouter, FastAPI
+from fastapi.testclient import TestClient
+
+from app.executor import InferencePool
+from app.monitoring import TimedRoute
+from app.profiling import ProfilingMiddleware, profiles
+
+
+class Artifacts:
+    version = "test"
+
+
+def busy_inference(n, artifacts):
+    return sum(i * i for i in range(n))
+
+
+def make_client():
+    app = FastAPI()
+    router = APIRouter(route_class=TimedRoute)
+    # Disabled pool: inference runs on the threadpool, the default deployment
+    pool = InferencePool(0)
+
+    @router.get("/sync")
+    def sync_endpoint():
+        return busy_inference(1000, Artifacts())
+
+    @router.get("/inference")
+    async def inference_endpoint():
+        return await pool.run("test", Artifacts(), busy_inference, 1000)
+
+    app.include_router(router)
+    app.add_middleware(ProfilingMiddleware, sample_rate=1.0)
+    return TestClient(app)
+
+
+def test_profiled_requests_on_the_threadpool():
+    client = make_client()
+
+    for path in ("/sync", "/inference"):
+        response = client.get(path)
+        assert response.status_code == 200
+        assert response.json() == sum(i * i for i in range(1000))
+
+        profile = profiles.get(int(response.headers["x-profile-id"]))
+        assert profile.status == 200
+        assert profile.summary()["profiled_calls"] >= 1
+        assert "busy_inference" in profile.text(limit=10_000)
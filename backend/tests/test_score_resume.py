@@ -0,0 +1,54 @@
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("pyarrow")
+
+BACKEND = Path(__file__).resolve().parent.parent
+MODEL_DIR = BACKEND / "model"
+
+
+def score(*args):
+    return subprocess.run(
+        [sys.executable, "score.py", *map(str, args), "--model", "cox", "--workers", "0"],
+        cwd=BACKEND, capture_output=True, text=True,
+    )
+
+
+@pytest.fixture
+def run(tmp_path):
+    model_dir = tmp_path / "model"
+    shutil.copytree(MODEL_DIR, model_dir)
+    patients = tmp_path / "patients.csv"
+    patients.write_text("edad,FIGO2023\n60,1\n70,2\n")
+    out = tmp_path / "scores"
+    assert score(patients, out, "--model-dir", model_dir).returncode == 0
+    return patients, out, model_dir
+
+
+def test_resume_with_the_same_model(run):
+    patients, out, model_dir = run
+    assert score(patients, out, "--model-dir", model_dir, "--resume").returncode == 0
+
+
+def test_resume_refuses_another_model_dir(run):
+    patients, out, model_dir = run
+    other = model_dir.with_name("other")
+    shutil.copytree(model_dir, other)
+
+    result = score(patients, out, "--model-dir", other, "--resume")
+    assert result.returncode != 0
+    assert "(model_dir)" in result.stderr
+
+
+def test_resume_refuses_changed_model_files(run):
+    patients, out, model_dir = run
+    with open(model_dir / "risk_thresholds.json", "a") as f:
+        f.write("\n")
+
+    result = score(patients, out, "--model-dir", model_dir, "--resume")
+    assert result.returncode != 0
+    assert "(model_version)" in result.stderr
@@ -0,0 +1,148 @@
+import asyncio
+import json
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+from pydantic import BaseModel
+
+from app import streaming
+from app.executor import ConcurrencyLimit
+from app.main import app
+from app.registry import registry
+from app.streaming import iter_lines, iter_records, score_stream
+
+
+class FakeRequest:
+    """The parts of a starlette Request the readers use: headers and a chunked body."""
+
+    def __init__(self, chunks, content_type="application/x-ndjson"):
+        self.chunks = [c.encode() if isinstance(c, str) else c for c in chunks]
+        self.headers = {"content-type": content_type}
+
+    async def stream(self):
+        for chunk in self.chunks:
+            yield chunk
+
+
+def collect(agen):
+    async def run():
+        return [item async for item in agen]
+    return asyncio.run(run())
+
+
+@pytest.fixture
+def short_lines(monkeypatch):
+    monkeypatch.setattr(streaming, "MAX_LINE_LENGTH", 10)
+
+
+def test_lines_split_across_chunks():
+    body = ["a", "b\r\nc", "", "d\ne", "\n\n", "f"]
+    assert collect(iter_lines(FakeRequest(body))) == ["ab", "cd", "e", "", "f"]
+
+
+def test_multibyte_characters_split_across_chunks():
+    body = "﻿é\nñ".encode()
+    assert collect(iter_lines(FakeRequest([body[:4], body[4:6], body[6:]]))) == ["é", "ñ"]
+
+
+def test_long_line_is_dropped_while_streaming(short_lines):
+    body = ["ok\n", "x" * 6, "x" * 6, "x" * 1000, "\nfine\n", "y" * 11]
+    assert collect(iter_lines(FakeRequest(body))) == ["ok", None, "fine", None]
+
+
+def test_long_ndjson_line_is_reported_inline(short_lines):
+    body = ['{"a": 1}\n', "{" * 50, '\n{"b": 2}\n']
+    records = collect(iter_records(FakeRequest(body)))
+    assert records == [
+        (0, {"a": 1}, None),
+        (1, None, "line longer than 10 characters"),
+        (2, {"b": 2}, None),
+    ]
+
+
+def test_body_without_newlines_keeps_a_bounded_buffer(short_lines):
+    chunks = ["z" * 7] * 1000
+    assert collect(iter_lines(FakeRequest(chunks))) == [None]
+
+
+def test_csv_quoted_cell_spanning_lines():
+    body = 'name,notes\nA,"first\n\nsecond, with ""quotes"""\nB,plain\n'
+    records = collect(iter_records(FakeRequest([body], "text/csv")))
+    assert records == [
+        (0, {"name": "A", "notes": 'first\n\nsecond, with "quotes"'}, None),
+        (1, {"name": "B", "notes": "plain"}, None),
+    ]
+
+
+def test_csv_unterminated_and_too_long_quoted_cells(short_lines):
+    body = 'a,b\n1,"\n' + "x\n" * 20 + '"\n2,3\n4,"open\n'
+    records = collect(iter_records(FakeRequest([body], "text/csv")))
+    assert records == [
+        (0, None, "line longer than 10 characters"),
+        (1, {"a": "2", "b": "3"}, None),
+        (2, None, "unterminated quoted cell"),
+    ]
+
+
+def test_ndjson_stream_matches_records():
+    rows = [{"i": i} for i in range(100)]
+    body = "".join(json.dumps(r) + "\n" for r in rows)
+    chunks = [body[i:i + 7] for i in range(0, len(body), 7)]
+    assert [r for _, r, _ in collect(iter_records(FakeRequest(chunks)))] == rows
+
+
+@pytest.mark.parametrize("model", ["cox", "bayesian"])
+def test_stream_response_carries_the_model_version(model):
+    response = TestClient(app).post(
+        f"/{model}/predict-stream",
+        content='{"edad": 60}\nnot json\n',
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+    assert response.status_code == 200
+    assert response.headers["x-model-version"] == registry.get(model).version
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [line["index"] for line in lines] == [0, 1]
+    assert "error" in lines[1]
+
+
+class Row(BaseModel):
+    x: int
+
+
+class FakePool:
+    """pool.run stand-in that raises `error` for batches holding a row in `failing`."""
+
+    def __init__(self, error, failing):
+        self.error = error
+        self.failing = failing
+        self.calls = 0
+
+    async def run(self, model, artifacts, fn, rows):
+        self.calls += 1
+        if any(row["x"] in self.failing for row in rows):
+            raise self.error
+        return [{"x": row["x"]} for row in rows]
+
+
+def stream(monkeypatch, fake, rows):
+    monkeypatch.setattr(streaming, "pool", fake)
+    body = "".join(json.dumps({"x": x}) + "\n" for x in rows)
+    chunks = collect(score_stream(FakeRequest([body]), Row, "test", None, None, ConcurrencyLimit("test")))
+    return [json.loads(line) for chunk in chunks for line in chunk.splitlines()]
+
+
+def test_row_errors_are_reported_against_their_row(monkeypatch):
+    fake = FakePool(ValueError("bad row"), failing={2})
+    lines = stream(monkeypatch, fake, [1, 2, 3])
+    assert lines == [{"index": 0, "x": 1}, {"index": 1, "error": "ValueError: bad row"}, {"index": 2, "x": 3}]
+    assert fake.calls == 4
+
+
+def test_unavailable_scoring_ends_the_stream(monkeypatch):
+    monkeypatch.setattr(streaming, "STREAM_CHUNK", 2)
+    busy = HTTPException(status_code=503, detail="busy, retry later")
+    fake = FakePool(busy, failing={3})
+    lines = stream(monkeypatch, fake, [1, 2, 3, 4, 5, 6])
+    assert lines == [{"index": 0, "x": 1}, {"index": 1, "x": 2}, {"error": "busy, retry later", "status": 503}]
+    assert fake.calls == 2
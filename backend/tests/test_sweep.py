@@ -0,0 +1,62 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+
+PATIENT = {"edad": 60, "grado_histologi": 1, "metasta_distan": 0, "FIGO2023": 1}
+
+
+@pytest.fixture(scope="module")
+def client():
+    return TestClient(app)
+
+
+def sweep(client, *axes):
+    return client.post("/cox/sweep", json={"patient": PATIENT, "axes": list(axes)})
+
+
+def test_curve_and_grid(client):
+    curve = sweep(client, {"feature": "edad", "values": [40, 60, 80]})
+    assert curve.status_code == 200
+    assert len(curve.json()["risk_score"]) == 3
+
+    grid = sweep(client, {"feature": "edad", "start": 40, "stop": 80, "num": 5}, {"feature": "imc", "values": [20, 30]})
+    assert grid.status_code == 200
+    assert [len(row) for row in grid.json()["risk_score"]] == [2] * 5
+
+
+def test_empty_values_are_rejected(client):
+    assert sweep(client, {"feature": "edad", "values": []}).status_code == 422
+
+
+@pytest.mark.parametrize("axis", [
+    {"feature": "edad", "values": [40, 60], "start": 40, "stop": 80},
+    {"feature": "edad", "values": [40, 60], "stop": 80},
+    {"feature": "edad", "start": 40},
+    {"feature": "not_a_field", "values": [1]},
+])
+def test_bad_axes_are_rejected(client, axis):
+    assert sweep(client, axis).status_code == 400
+
+
+def test_axes_must_differ(client):
+    assert sweep(client, {"feature": "edad", "values": [40]}, {"feature": "edad", "values": [60]}).status_code == 400
+
+
+@pytest.mark.parametrize("axis", [
+    {"feature": "edad", "values": [40, 150]},
+    {"feature": "edad", "start": 10, "stop": 80},
+    {"feature": "asa", "values": [1, 5]},
+    {"feature": "asa", "values": [1, 2.5]},
+    {"feature": "asa", "start": 1, "stop": 4},
+])
+def test_values_outside_the_field_constraints_are_rejected(client, axis):
+    response = sweep(client, axis)
+    assert response.status_code == 422
+    assert response.json()["detail"][0]["loc"][:3] == ["body", "axes", 0]
+
+
+def test_integer_fields_sweep_whole_steps(client):
+    response = sweep(client, {"feature": "asa", "start": 1, "stop": 4, "num": 4})
+    assert response.status_code == 200
+    assert response.json()["values"] == [[1, 2, 3, 4]]